@@ -0,0 +1,48 @@
+"""daily totals
+
+Revision ID: 3f1c9a7d2b64
+Revises: b4b8233277fd
+Create Date: 2025-09-15 10:02:11.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'b4b8233277fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('currency', sa.String(length=5), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'type', 'category', 'currency')
+    )
+    # backfill from the existing history
+    op.execute(
+        """
+        INSERT INTO daily_totals (user_id, day, type, category, currency, amount, count)
+        SELECT user_id, tx_date::date, type, coalesce(category, ''), currency,
+               sum(amount), count(*)
+        FROM transactions
+        GROUP BY user_id, tx_date::date, type, coalesce(category, ''), currency
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_totals')
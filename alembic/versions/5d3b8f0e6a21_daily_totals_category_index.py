@@ -0,0 +1,27 @@
+"""daily totals category index
+
+Revision ID: 5d3b8f0e6a21
+Revises: c71d0e5a9b38
+Create Date: 2025-09-23 09:48:52.130476
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3b8f0e6a21'
+down_revision: Union[str, Sequence[str], None] = 'c71d0e5a9b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_daily_totals_user_id_day', 'daily_totals', ['user_id', 'day'], unique=False, postgresql_include=['type', 'category', 'amount', 'count'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_totals_user_id_day', table_name='daily_totals')
@@ -0,0 +1,27 @@
+"""transactions keyset index
+
+Revision ID: 8a2e6c4f1d90
+Revises: 3f1c9a7d2b64
+Create Date: 2025-09-16 14:40:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a2e6c4f1d90'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_user_id_tx_date_id', 'transactions', ['user_id', 'tx_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_id_tx_date_id', table_name='transactions')
@@ -0,0 +1,57 @@
+"""fx rates and base amounts
+
+Revision ID: 9e4a7b2c1f53
+Revises: 5d3b8f0e6a21
+Create Date: 2025-09-26 11:02:17.418093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a7b2c1f53'
+down_revision: Union[str, Sequence[str], None] = '5d3b8f0e6a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fx_rates',
+    sa.Column('currency', sa.String(length=5), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('rate', sa.Numeric(precision=18, scale=8), nullable=False),
+    sa.PrimaryKeyConstraint('currency', 'day')
+    )
+    op.add_column('transactions', sa.Column('base_amount', sa.Numeric(precision=14, scale=2), nullable=True))
+    op.add_column('daily_totals', sa.Column('base_amount', sa.Numeric(precision=16, scale=2), server_default='0', nullable=False))
+    # rows already in the user's currency need no rate; the rest are filled
+    # in by `python -m scripts.fx renormalize` once rates are loaded
+    op.execute("""
+        UPDATE transactions t SET base_amount = t.amount
+        FROM users u
+        WHERE u.id = t.user_id AND u.currency = t.currency
+    """)
+    op.execute("""
+        UPDATE daily_totals d SET base_amount = d.amount
+        FROM users u
+        WHERE u.id = d.user_id AND u.currency = d.currency
+    """)
+    op.drop_index('ix_daily_totals_user_id_type_day', table_name='daily_totals')
+    op.create_index('ix_daily_totals_user_id_type_day', 'daily_totals', ['user_id', 'type', 'day'], unique=False, postgresql_include=['base_amount', 'count'])
+    op.drop_index('ix_daily_totals_user_id_day', table_name='daily_totals')
+    op.create_index('ix_daily_totals_user_id_day', 'daily_totals', ['user_id', 'day'], unique=False, postgresql_include=['type', 'category', 'base_amount', 'count'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_totals_user_id_day', table_name='daily_totals')
+    op.create_index('ix_daily_totals_user_id_day', 'daily_totals', ['user_id', 'day'], unique=False, postgresql_include=['type', 'category', 'amount', 'count'])
+    op.drop_index('ix_daily_totals_user_id_type_day', table_name='daily_totals')
+    op.create_index('ix_daily_totals_user_id_type_day', 'daily_totals', ['user_id', 'type', 'day'], unique=False, postgresql_include=['amount', 'count'])
+    op.drop_column('daily_totals', 'base_amount')
+    op.drop_column('transactions', 'base_amount')
+    op.drop_table('fx_rates')
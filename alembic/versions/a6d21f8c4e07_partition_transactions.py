@@ -0,0 +1,102 @@
+"""partition transactions by tx_date
+
+Revision ID: a6d21f8c4e07
+Revises: 9e4a7b2c1f53
+Create Date: 2025-09-29 15:20:44.906321
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d21f8c4e07'
+down_revision: Union[str, Sequence[str], None] = '9e4a7b2c1f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# months created past the current one; later ones come from the
+# ensure_transaction_partitions task
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, user_id, type, amount, currency, category, tx_date, created_at, base_amount"
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _months(first: date, last: date):
+    month = first.replace(day=1)
+    while month <= last:
+        upper = _add_months(month, 1)
+        yield month, upper
+        month = upper
+
+
+def _create_indexes() -> None:
+    op.create_index('ix_transactions_user_id_tx_date_id', 'transactions', ['user_id', 'tx_date', 'id'], unique=False)
+    op.create_index('ix_transactions_user_id_type_tx_date', 'transactions', ['user_id', 'type', 'tx_date'], unique=False, postgresql_include=['id', 'amount', 'currency', 'category'])
+
+
+def _table_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('transactions_id_seq')"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('currency', sa.String(length=5), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('tx_date', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('base_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='transactions_user_id_fkey'),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rows are copied into a new partitioned table; indexes are built after
+    # the copy, which is much faster than maintaining them row by row
+    first, last = op.get_bind().execute(
+        sa.text("SELECT min(tx_date)::date, max(tx_date)::date FROM transactions")
+    ).one()
+    today = date.today()
+    first = min(first or today, today)
+    last = _add_months(max(last or today, today), MONTHS_AHEAD)
+
+    # the old table's indexes go away with it, before the new ones are named
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.create_table('transactions', *_table_columns(), postgresql_partition_by='RANGE (tx_date)')
+    for lower, upper in _months(first, last):
+        op.execute(
+            f"CREATE TABLE transactions_p{lower:%Y_%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_unpartitioned")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.drop_table('transactions_unpartitioned')
+
+    op.create_primary_key('transactions_pkey', 'transactions', ['id', 'tx_date'])
+    _create_indexes()
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+
+    op.create_table('transactions', *_table_columns())
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_partitioned")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
+
+    op.create_primary_key('transactions_pkey', 'transactions', ['id'])
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    _create_indexes()
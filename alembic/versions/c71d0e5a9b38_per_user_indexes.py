@@ -0,0 +1,32 @@
+"""per-user indexes
+
+Revision ID: c71d0e5a9b38
+Revises: 8a2e6c4f1d90
+Create Date: 2025-09-18 11:27:05.561947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71d0e5a9b38'
+down_revision: Union[str, Sequence[str], None] = '8a2e6c4f1d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transactions_user_id_type_tx_date', 'transactions', ['user_id', 'type', 'tx_date'], unique=False, postgresql_include=['id', 'amount', 'currency', 'category'])
+    op.create_index('ix_users_telegram_chat_id', 'users', ['telegram_chat_id'], unique=False, postgresql_where=sa.text('telegram_chat_id IS NOT NULL'))
+    op.create_index('ix_daily_totals_user_id_type_day', 'daily_totals', ['user_id', 'type', 'day'], unique=False, postgresql_include=['amount', 'count'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_totals_user_id_type_day', table_name='daily_totals')
+    op.drop_index('ix_users_telegram_chat_id', table_name='users')
+    op.drop_index('ix_transactions_user_id_type_tx_date', table_name='transactions')
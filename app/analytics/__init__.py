@@ -0,0 +1,16 @@
+from app.analytics.frame import TransactionFrame
+from app.analytics.insights import compute_insights, frame_start, get_insights
+from app.analytics.prompt import PromptContext, build_prompt_context
+from app.analytics.recurring import detect_for_users, detect_recurring, scan_recurring
+
+__all__ = [
+    "PromptContext",
+    "TransactionFrame",
+    "build_prompt_context",
+    "compute_insights",
+    "detect_for_users",
+    "detect_recurring",
+    "frame_start",
+    "get_insights",
+    "scan_recurring",
+]
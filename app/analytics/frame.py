@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import get_transaction_columns
+
+
+class TransactionFrame:
+    """A user's transactions over [start, end] as parallel NumPy columns.
+
+    ``days`` are offsets from ``start``, ``amounts`` are in the user's base
+    currency and ``category_codes`` index into ``categories`` ("" stands for
+    uncategorized).
+    """
+
+    def __init__(
+        self,
+        start: date,
+        end: date,
+        ids: np.ndarray,
+        days: np.ndarray,
+        amounts: np.ndarray,
+        is_expense: np.ndarray,
+        category_codes: np.ndarray,
+        categories: List[str],
+    ):
+        self.start = start
+        self.end = end
+        self.ids = ids
+        self.days = days
+        self.amounts = amounts
+        self.is_expense = is_expense
+        self.category_codes = category_codes
+        self.categories = categories
+
+    @classmethod
+    async def load(
+        cls, db: AsyncSession, user_id: int, start: date, end: date
+    ) -> "TransactionFrame":
+        row = await get_transaction_columns(db, user_id, start, end)
+        return cls(
+            start,
+            end,
+            np.array(row.ids or [], dtype=np.int64),
+            np.array(row.days or [], dtype=np.int32),
+            np.array(row.amounts or [], dtype=np.float64),
+            np.array(row.is_expense or [], dtype=bool),
+            np.array(row.category_codes or [], dtype=np.int32),
+            list(row.categories or []),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def n_days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def day(self, index: int) -> date:
+        return self.start + timedelta(days=int(index))
+
+    def daily(self, mask: np.ndarray) -> np.ndarray:
+        """Per-day sums of the masked amounts, one slot per day of the frame."""
+        return np.bincount(
+            self.days[mask], weights=self.amounts[mask], minlength=self.n_days
+        )
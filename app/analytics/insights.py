@@ -0,0 +1,143 @@
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics.frame import TransactionFrame
+from app.core.cache import analytics_cache
+from app.core.config import settings
+from app.db.replica import may_cache
+from app.models import User
+from app.schemas import InsightsOut
+
+# the 30-day average of the first displayed day needs 29 days before it
+ROLLING_LOOKBACK = 29
+
+
+def rolling_mean(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing ``window``-day mean; the first days average what exists."""
+    total = np.cumsum(series)
+    total[window:] = total[window:] - total[:-window]
+    return total / np.minimum(np.arange(1, len(series) + 1), window)
+
+
+def category_zscores(
+    codes: np.ndarray, amounts: np.ndarray, n_categories: int, min_size: int
+) -> tuple:
+    """Z-score of every amount within its category, plus per-category means.
+
+    Categories with fewer than ``min_size`` transactions or no spread get a
+    z-score of 0.
+    """
+    count = np.bincount(codes, minlength=n_categories)
+    total = np.bincount(codes, weights=amounts, minlength=n_categories)
+    squares = np.bincount(codes, weights=amounts * amounts, minlength=n_categories)
+    size = np.maximum(count, 1)
+    mean = total / size
+    std = np.sqrt(np.maximum(squares / size - mean * mean, 0))
+    usable = (count >= min_size) & (std > 1e-9)
+    scale = np.where(usable, std, 1.0)
+    zscores = np.where(usable[codes], (amounts - mean[codes]) / scale[codes], 0.0)
+    return zscores, mean
+
+
+def compute_insights(frame: TransactionFrame, today: date, days: int) -> dict:
+    """Rolling averages, month-to-date burn rate and anomalies as of ``today``.
+
+    ``frame`` must end on ``today`` and reach back at least ``days`` plus
+    ROLLING_LOOKBACK days and to the first of the month.
+    """
+    expense = frame.daily(frame.is_expense)
+    income = frame.daily(~frame.is_expense)
+    avg_7d = rolling_mean(expense, 7)
+    avg_30d = rolling_mean(expense, 30)
+
+    now = (today - frame.start).days
+    month_first = now - today.day + 1
+    month_expense = float(expense[month_first : now + 1].sum())
+    month_income = float(income[month_first : now + 1].sum())
+    burn_rate = month_expense / today.day
+    remaining = calendar.monthrange(today.year, today.month)[1] - today.day
+    projected_expense = month_expense + burn_rate * remaining
+
+    first = now - days + 1
+    points = [
+        {
+            "date": frame.day(first + offset),
+            "income": round(values[0], 2),
+            "expense": round(values[1], 2),
+            "avg_7d": round(values[2], 2),
+            "avg_30d": round(values[3], 2),
+        }
+        for offset, values in enumerate(
+            np.column_stack(
+                (income[first:], expense[first:], avg_7d[first:], avg_30d[first:])
+            ).tolist()
+        )
+    ]
+
+    spent = np.flatnonzero(frame.is_expense)
+    zscores, means = category_zscores(
+        frame.category_codes[spent],
+        frame.amounts[spent],
+        len(frame.categories),
+        settings.INSIGHTS_MIN_CATEGORY_SIZE,
+    )
+    flagged = np.flatnonzero(
+        (np.abs(zscores) >= settings.INSIGHTS_ZSCORE_THRESHOLD)
+        & (frame.days[spent] >= first)
+    )
+    flagged = flagged[np.argsort(-np.abs(zscores[flagged]), kind="stable")]
+    anomalies = []
+    for index in flagged[: settings.INSIGHTS_MAX_ANOMALIES].tolist():
+        row = spent[index]
+        code = frame.category_codes[row]
+        anomalies.append(
+            {
+                "id": int(frame.ids[row]),
+                "date": frame.day(frame.days[row]),
+                "category": frame.categories[code] or None,
+                "amount": round(float(frame.amounts[row]), 2),
+                "category_mean": round(float(means[code]), 2),
+                "zscore": round(float(zscores[index]), 2),
+            }
+        )
+
+    return {
+        "start": frame.day(first),
+        "end": today,
+        "transactions": int(np.count_nonzero(frame.days >= first)),
+        "month_income": round(month_income, 2),
+        "month_expense": round(month_expense, 2),
+        "burn_rate": round(burn_rate, 2),
+        "projected_month_expense": round(projected_expense, 2),
+        "projected_month_balance": round(month_income - projected_expense, 2),
+        "points": points,
+        "anomalies": anomalies,
+    }
+
+
+def frame_start(today: date, days: int) -> date:
+    """First day to load for ``compute_insights`` over the last ``days`` days."""
+    lookback = max(days + ROLLING_LOOKBACK, settings.INSIGHTS_HISTORY_DAYS)
+    return min(today - timedelta(days=lookback - 1), today.replace(day=1))
+
+
+async def get_insights(
+    db: AsyncSession, user: User, days: int = 30, today: date = None
+) -> dict:
+    """Cached insights for the last ``days`` days, in the user's currency."""
+    today = today or date.today()
+
+    async def compute() -> dict:
+        frame = await TransactionFrame.load(
+            db, user.id, frame_start(today, days), today
+        )
+        return InsightsOut(
+            currency=user.currency, **compute_insights(frame, today, days)
+        ).model_dump(mode="json", by_alias=True)
+
+    return await analytics_cache.get_or_compute(
+        user.id, f"insights:{days}:{today}", compute, store=may_cache(db)
+    )
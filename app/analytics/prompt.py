@@ -0,0 +1,190 @@
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import (
+    get_category_breakdown,
+    get_transaction_rows,
+    get_transactions_timeseries,
+)
+from app.models import User
+
+# English text and numbers average about four characters per token; close
+# enough to keep prompts inside the budget without a tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+INSTRUCTIONS = (
+    "You are a financial assistant. Answer the user's question using the "
+    "summary of their finances below. Amounts are in {currency} unless a "
+    "line names another currency."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class PromptContext:
+    """Instructions for one AI answer and what building them cost."""
+
+    def __init__(self, text: str, build_ms: float, omitted: int):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.build_ms = build_ms
+        # summary lines dropped to stay within the token budget
+        self.omitted = omitted
+
+
+class _Section:
+    def __init__(self, title: str, lines: list, drop_first: bool = False):
+        self.title = title
+        self.lines = lines
+        # which end to give up first: the oldest buckets of a series come
+        # first, the least relevant rows of a ranking come last
+        self.drop_first = drop_first
+        self.omitted = 0
+
+    def render(self) -> str:
+        text = "\n".join([f"{self.title}:", *self.lines])
+        if self.omitted:
+            text += f"\n({self.omitted} more not shown)"
+        return text
+
+    def drop(self) -> None:
+        self.lines.pop(0 if self.drop_first else -1)
+        self.omitted += 1
+
+
+def _fit(sections: list, budget: int) -> int:
+    """Drop lines, lowest-priority section first, until the text fits."""
+    size = sum(len(section.render()) + 2 for section in sections)
+    omitted = 0
+    for section in reversed(sections):
+        while section.lines and size > budget * CHARS_PER_TOKEN:
+            before = len(section.render())
+            section.drop()
+            size += len(section.render()) - before
+            omitted += 1
+    return omitted
+
+
+def _bucket(start: date, end: date) -> str:
+    days = (end - start).days + 1
+    if days <= 62:
+        return "day"
+    return "week" if days <= 366 else "month"
+
+
+def _money(value) -> str:
+    return f"{float(value or 0):.2f}"
+
+
+def _breakdown_sections(rows: list, top: int) -> tuple:
+    totals = {}
+    categories = {"expense": {}, "income": {}}
+    for row in rows:
+        key = (row.period, row.type)
+        if row.is_total:
+            totals[key] = row
+        else:
+            name = row.category or "Uncategorized"
+            categories[row.type].setdefault(name, {})[row.period] = row
+    sections = []
+    for tx_type, title in (("expense", "Expenses"), ("income", "Income")):
+        ranked = sorted(
+            (
+                (name, periods)
+                for name, periods in categories[tx_type].items()
+                if "current" in periods
+            ),
+            key=lambda item: item[1]["current"].amount,
+            reverse=True,
+        )
+        lines = []
+        for name, periods in ranked:
+            current, previous = periods["current"], periods.get("previous")
+            line = f"{name}: {_money(current.amount)} ({current.count} tx)"
+            if previous is not None:
+                line += f", previous {_money(previous.amount)}"
+            lines.append(line)
+        section = _Section(f"{title} by category", lines[:top])
+        section.omitted = max(len(lines) - top, 0)
+        sections.append(section)
+    return totals, sections
+
+
+def _total(totals: dict, period: str, tx_type: str) -> tuple:
+    row = totals.get((period, tx_type))
+    return (float(row.amount), row.count) if row is not None else (0.0, 0)
+
+
+async def build_prompt_context(
+    db: AsyncSession, user: User, start: date, end: date
+) -> PromptContext:
+    """Compact summary of the user's finances over [start, end] as model
+    instructions, within AI_PROMPT_MAX_TOKENS.
+
+    Totals come from the daily rollup: per category against the previous
+    period of the same length, a day/week/month series depending on the
+    window, and the latest AI_PROMPT_RECENT_ROWS transactions. When over
+    budget, recent rows go first, then the oldest buckets, then the
+    smallest categories.
+    """
+    started = time.perf_counter()
+    breakdown = await get_category_breakdown(db, user.id, start, end)
+    bucket = _bucket(start, end)
+    series = await get_transactions_timeseries(db, user.id, start, end, bucket)
+    recent = await get_transaction_rows(
+        db,
+        user.id,
+        limit=settings.AI_PROMPT_RECENT_ROWS,
+        start_date=start,
+        end_date=datetime.combine(end, datetime.max.time()),
+    )
+
+    totals, category_sections = _breakdown_sections(
+        breakdown, settings.AI_PROMPT_TOP_CATEGORIES
+    )
+    previous_start = start - (end - start) - timedelta(days=1)
+    income, income_count = _total(totals, "current", "income")
+    expense, expense_count = _total(totals, "current", "expense")
+    previous_income, _ = _total(totals, "previous", "income")
+    previous_expense, _ = _total(totals, "previous", "expense")
+    header = _Section(
+        "Overview",
+        [
+            f"Period: {start} to {end}",
+            f"Income: {_money(income)} ({income_count} tx), "
+            f"expenses: {_money(expense)} ({expense_count} tx), "
+            f"net: {_money(income - expense)}",
+            f"Previous period ({previous_start} to {start - timedelta(days=1)}): "
+            f"income {_money(previous_income)}, expenses {_money(previous_expense)}",
+        ],
+    )
+    series_section = _Section(
+        f"Income / expenses per {bucket}, periods without transactions left out",
+        [
+            f"{point.bucket}: +{_money(point.income)} / -{_money(point.expense)}"
+            for point in series
+            if point.income or point.expense
+        ],
+        drop_first=True,
+    )
+    recent_section = _Section(
+        "Latest transactions",
+        [
+            f"{row.tx_date:%Y-%m-%d} {row.type} {row.amount:.2f} {row.currency}"
+            f" {row.category or 'Uncategorized'}"
+            for row in recent
+        ],
+    )
+
+    instructions = INSTRUCTIONS.format(currency=user.currency)
+    fixed = f"{instructions}\n\n{header.render()}"
+    # highest priority first: _fit trims from the end of this list
+    sections = [*category_sections, series_section, recent_section]
+    omitted = _fit(sections, settings.AI_PROMPT_MAX_TOKENS - estimate_tokens(fixed))
+    text = "\n\n".join([fixed, *(section.render() for section in sections)])
+    return PromptContext(text, (time.perf_counter() - started) * 1000, omitted)
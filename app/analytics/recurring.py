@@ -0,0 +1,158 @@
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import (
+    get_expense_columns,
+    get_user_ids_page,
+    lock_checkpoint,
+    replace_recurring_patterns,
+    save_checkpoint,
+)
+
+# amounts within 10% of each other count as "the same payment"
+AMOUNT_TOLERANCE = 0.1
+MIN_INTERVAL_DAYS = 6
+MAX_INTERVAL_DAYS = 370
+
+
+def detect_recurring(
+    user_ids: np.ndarray,
+    days: np.ndarray,
+    amounts: np.ndarray,
+    category_codes: np.ndarray,
+    today: int,
+    min_occurrences: int,
+) -> dict:
+    """Find recurring payments among the expenses of many users at once.
+
+    Expenses are grouped by (user, category) and split into runs of similar
+    amounts; a run is recurring when it has ``min_occurrences`` payments at
+    a near-constant interval and has not missed its latest due date by more
+    than half an interval. ``days`` and ``today`` share one origin. Returns
+    parallel arrays, one entry per pattern.
+    """
+    if not len(days):
+        empty = np.empty(0, dtype=np.int64)
+        return dict(
+            user_ids=empty,
+            category_codes=empty,
+            amounts=np.empty(0),
+            intervals=empty,
+            occurrences=empty,
+            last_days=empty,
+        )
+
+    order = np.lexsort((amounts, category_codes, user_ids))
+    user_ids, days = user_ids[order], days[order]
+    amounts, category_codes = amounts[order], category_codes[order]
+    boundary = np.ones(len(days), dtype=bool)
+    boundary[1:] = (
+        (user_ids[1:] != user_ids[:-1])
+        | (category_codes[1:] != category_codes[:-1])
+        | (amounts[1:] > amounts[:-1] * (1 + AMOUNT_TOLERANCE) + 0.01)
+    )
+    runs = np.cumsum(boundary) - 1
+
+    order = np.lexsort((days, runs))
+    runs, user_ids, days = runs[order], user_ids[order], days[order]
+    amounts, category_codes = amounts[order], category_codes[order]
+    starts = np.flatnonzero(np.r_[True, runs[1:] != runs[:-1]])
+    ends = np.r_[starts[1:], len(runs)] - 1
+
+    gaps = np.diff(days, prepend=days[0]).astype(np.float64)
+    gaps[starts] = 0
+    count = np.bincount(runs)
+    n_gaps = np.maximum(count - 1, 1)
+    mean_gap = np.bincount(runs, weights=gaps) / n_gaps
+    spread = np.sqrt(
+        np.maximum(np.bincount(runs, weights=gaps * gaps) / n_gaps - mean_gap**2, 0)
+    )
+    interval = np.rint(mean_gap).astype(np.int64)
+    last_days = days[ends].astype(np.int64)
+
+    keep = (
+        (count >= min_occurrences)
+        & (mean_gap >= MIN_INTERVAL_DAYS)
+        & (mean_gap <= MAX_INTERVAL_DAYS)
+        & (spread <= np.maximum(1.5, 0.05 * mean_gap))
+        & (last_days + 1.5 * mean_gap >= today)
+    )
+    return dict(
+        user_ids=user_ids[starts][keep].astype(np.int64),
+        category_codes=category_codes[starts][keep].astype(np.int64),
+        amounts=(np.bincount(runs, weights=amounts) / count)[keep],
+        intervals=interval[keep],
+        occurrences=count[keep],
+        last_days=last_days[keep],
+    )
+
+
+async def detect_for_users(
+    db: AsyncSession, user_ids: list, today: date = None
+) -> list:
+    """Recurring patterns of `user_ids` as `recurring_patterns` rows."""
+    today = today or date.today()
+    start = today - timedelta(days=settings.RECURRING_LOOKBACK_DAYS)
+    row = await get_expense_columns(db, user_ids, start)
+    found = detect_recurring(
+        np.array(row.user_ids or [], dtype=np.int64),
+        np.array(row.days or [], dtype=np.int32),
+        np.array(row.amounts or [], dtype=np.float64),
+        np.array(row.category_codes or [], dtype=np.int32),
+        (today - start).days,
+        settings.RECURRING_MIN_OCCURRENCES,
+    )
+    categories = row.categories or []
+    return [
+        {
+            "user_id": user_id,
+            "category": categories[code] or None,
+            "amount": round(amount, 2),
+            "interval_days": interval,
+            "occurrences": occurrences,
+            "last_date": start + timedelta(days=last_day),
+            "next_date": start + timedelta(days=last_day + interval),
+        }
+        for user_id, code, amount, interval, occurrences, last_day in zip(
+            found["user_ids"].tolist(),
+            found["category_codes"].tolist(),
+            found["amounts"].tolist(),
+            found["intervals"].tolist(),
+            found["occurrences"].tolist(),
+            found["last_days"].tolist(),
+        )
+    ]
+
+
+async def scan_recurring(
+    db: AsyncSession, shard: int = 0, shards: int = 1, today: date = None
+) -> int:
+    """Refresh recurring patterns of every user in ``shard``, batch by batch.
+
+    Each batch's patterns and the checkpoint (last user id done) commit
+    together, so a crashed or killed scan resumes after the last finished
+    batch. A completed pass resets the checkpoint. Returns the number of
+    users processed, 0 when another worker is already scanning the shard.
+    """
+    name = f"recurring:{shard}/{shards}"
+    processed = 0
+    while True:
+        after = await lock_checkpoint(db, name)
+        if after is None:
+            await db.rollback()
+            return processed
+        user_ids = await get_user_ids_page(
+            db, after, settings.RECURRING_BATCH_USERS, shard, shards
+        )
+        if not user_ids:
+            await save_checkpoint(db, name, 0)
+            await db.commit()
+            return processed
+        patterns = await detect_for_users(db, user_ids, today)
+        await replace_recurring_patterns(db, user_ids, patterns)
+        await save_checkpoint(db, name, user_ids[-1])
+        await db.commit()
+        processed += len(user_ids)
@@ -1,22 +1,23 @@
+from typing import AsyncIterator
+
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db
 from fastapi.security import OAuth2PasswordBearer
 
 from app.db.session import async_session
 from app.core.config import settings
 from app.core.security import decode_access_token
+from app.core.user_cache import user_cache
+from app.crud import get_user, get_user_by_email
+from app.db.replica import read_session_for
 from app.models import User
-from sqlalchemy.future import select
 
 # Для login-роуту: url токену
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/login")  # підлаштуй свій шлях
 
 
 # Dependency для отримання поточного користувача з JWT токена
-async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,9 +26,32 @@ async def get_current_user(
     payload = decode_access_token(token)
     if not payload or "sub" not in payload:
         raise credentials_exception
-    email: str = payload["sub"]
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
+    user_id = payload.get("uid")
+    user = None if user_id is None else await user_cache.get(user_id)
     if user is None:
+        # own short session: a miss mustn't keep a connection checked out for
+        # the rest of the request (which may wait seconds on the AI model);
+        # the user comes back detached, the same as from the cache
+        async with async_session() as db:
+            if user_id is None:
+                # tokens issued before the uid/ver claims existed
+                user = await get_user_by_email(db, payload["sub"])
+            else:
+                user = await get_user(db, user_id)
+                if user is not None:
+                    await user_cache.set(user)
+    if user is None or payload.get("ver", 0) != user.token_version:
         raise credentials_exception
     return user
+
+
+async def get_read_db(
+    current_user: User = Depends(get_current_user),
+) -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints over the user's own data.
+
+    Served by the read replica unless the user wrote within
+    REPLICA_STALENESS_SECONDS, so they always see their own writes.
+    """
+    async with read_session_for(current_user.id) as session:
+        yield session
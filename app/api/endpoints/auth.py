@@ -1,23 +1,30 @@
 import base64
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 import json
+import logging
 import uuid
-from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
-from openai import OpenAI
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from openai import OpenAIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
+from kombu.exceptions import OperationalError
 
-from app.api.deps import get_current_user
+from app.analytics import build_prompt_context
+from app.api.deps import get_current_user, get_read_db
+from app.core.ai import ai_client
 from app.core.billing import (
-    cancel_subscription,
+    CircuitOpenError,
+    LiqPayError,
     create_payment_data,
     generate_signature,
+    liqpay_client,
 )
 from app.db.session import get_db
 from app.schemas import (
     AIGenerateInput,
     AnalyticsTransaction,
-    AnalyticsTransactionForAI,
     CheckEmail,
     RegistrationInput,
     UserCreate,
@@ -27,22 +34,27 @@ from app.schemas import (
 )
 from app.models import Order, User
 from app.core.security import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
+    hash_password,
+    token_claims,
+    verify_and_update_password,
 )
 from app.core.config import settings
+from app.core.metrics import AI_PROMPT_BUILD_SECONDS, AI_PROMPT_TOKENS
 from app.crud import (
     create_order,
-    get_order,
-    get_transactions,
-    get_user,
+    get_is_subscribed,
     get_user_by_email,
     create_user,
+    record_payment_event,
+    revoke_user_tokens,
     update_user,
 )
+from app.tasks import process_payment_event, renormalize_user_currency
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -52,7 +64,7 @@ async def signup(user_in: RegistrationInput, db: AsyncSession = Depends(get_db))
     user = await get_user_by_email(db, user_in.email)
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await hash_password(user_in.password)
     user_obj = User(
         email=user_in.email,
         hashed_password=hashed_password,
@@ -65,7 +77,7 @@ async def signup(user_in: RegistrationInput, db: AsyncSession = Depends(get_db))
     # Використовуємо CRUD create_user
     user = await create_user(db, user_obj)
     access_token = create_access_token(
-        {"sub": user.email},
+        token_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     return {
@@ -74,22 +86,38 @@ async def signup(user_in: RegistrationInput, db: AsyncSession = Depends(get_db))
     }
 
 
+async def _authenticate(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    # end the read transaction: don't hold a pooled connection while the
+    # password waits for a hashing thread
+    await db.commit()
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        # hashed with an older work factor: upgrade while we know the password
+        user = await update_user(db, user.id, {"hashed_password": new_hash})
+    return user
+
+
 @router.post("/login")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
-    user = await get_user_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await _authenticate(db, form_data.username, form_data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
     access_token = create_access_token(
-        {"sub": user.email},
+        token_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     refresh_token = create_refresh_token(
-        {"sub": user.email},
+        token_claims(user),
         expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
     )
     return {
@@ -101,14 +129,14 @@ async def login(
 
 @router.post("/login/app")
 async def login_app(data: LoginInApp, db: AsyncSession = Depends(get_db)):
-    user = await get_user_by_email(db, data.email)
-    if not user or not verify_password(data.password, user.hashed_password):
+    user = await _authenticate(db, data.email, data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
     access_token = create_access_token(
-        {"sub": user.email},
+        token_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     return {"access_token": access_token, "user": UserOut.model_validate(user)}
@@ -120,7 +148,7 @@ async def refresh_token(refresh_token: str = Body(..., embed=True)):
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
     new_access_token = create_access_token(
-        {"sub": payload["sub"]},
+        {key: payload[key] for key in ("sub", "uid", "ver") if key in payload},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     return {"access_token": new_access_token, "token_type": "bearer"}
@@ -133,6 +161,13 @@ async def get_me(
     return user
 
 
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    await revoke_user_tokens(db, user.id)
+
+
 @router.put("/me", response_model=UserOut)
 async def update_me(
     user_in: UserUpdate,
@@ -140,7 +175,13 @@ async def update_me(
     user: User = Depends(get_current_user),
 ):
     update_data = user_in.model_dump(exclude_unset=True)
+    old_currency = user.currency
     user = await update_user(db, user.id, update_data)
+    if user.currency != old_currency:
+        try:
+            renormalize_user_currency.delay(user.id)
+        except OperationalError:
+            logger.exception("Could not queue currency renormalization")
     return user
 
 
@@ -177,7 +218,19 @@ async def create_subscription_payment(
 async def cancel_subscription_api(
     db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
-    result = cancel_subscription(user.order_id)
+    try:
+        await liqpay_client.cancel_subscription(user.order_id)
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment provider unavailable, try again later",
+        )
+    except LiqPayError as exc:
+        logger.warning("Cancelling subscription of user %s failed: %s", user.id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Payment provider error",
+        )
     return {"status": "success"}
 
 
@@ -193,108 +246,85 @@ async def payment_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         return {"status": "error", "message": "Invalid signature"}
 
     decoded_data = json.loads(base64.b64decode(data))
-    print("Payment received:", decoded_data)
-
-    status = decoded_data.get("status")
-    action = decoded_data.get("action")
-    order_id = decoded_data.get("order_id")
-    order = await get_order(db, decoded_data.get("order_id"))
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    user = await get_user(db, order.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if status == "subscribed" and action == "subscribe":
-
-        data = {
-            "is_subscribed": True,
-            "subscription_start": datetime.fromtimestamp(
-                decoded_data.get("create_date") / 1000
-            ),
-            "subscription_end": datetime.fromtimestamp(
-                decoded_data.get("end_date") / 1000
-            ),
-            "subscription_id": decoded_data.get("liqpay_order_id"),
-            "cancel_at_period_end": False,
-            "liqpay_order_id": decoded_data.get("liqpay_order_id"),
-            "order_id": decoded_data.get("order_id"),
-        }
-        await update_user(db, user.id, data)
-
-    elif action in ["pay", "subscribe"] and status == "success":
-        data = {
-            "is_subscribed": True,
-            "subscription_start": datetime.fromtimestamp(
-                decoded_data.get("create_date") / 1000
-            ),
-            "subscription_end": datetime.fromtimestamp(
-                decoded_data.get("end_date") / 1000
-            ),
-            "subscription_id": decoded_data.get("liqpay_order_id"),
-            "cancel_at_period_end": False,
-            "liqpay_order_id": decoded_data.get("liqpay_order_id"),
-            "order_id": decoded_data.get("order_id"),
-        }
-        await update_user(db, user.id, data)
-
-    elif action == "subscribe" and status == "unsubscribed":
-        data = {
-            "cancel_at_period_end": True,
-        }
-        await update_user(db, user.id, data)
-        print(f"Підписка скасована: {order_id}, user: {user.id}")
-
-    elif (action in ["pay", "subscribe"]) and status in [
-        "failure",
-        "error",
-        "reversed",
-    ]:
-        data = {
-            "is_subscribed": False,
-            "subscription_id": decoded_data.get("liqpay_order_id"),
-        }
-        await update_user(db, user.id, data)
-
-    else:
-        print(f"Інший статус LiqPay: {decoded_data}")
-
-    return {"status": status}
+    logger.info("Payment received: %s", decoded_data)
+
+    # stored first and applied by a worker: LiqPay gets its answer without
+    # waiting on the user update, and redeliveries stop at the unique key
+    event_id = await record_payment_event(db, decoded_data)
+    if event_id is not None:
+        try:
+            process_payment_event.delay(event_id)
+        except OperationalError:
+            logger.exception("Could not queue payment event %s", event_id)
+    return {"status": decoded_data.get("status")}
 
 
 @router.post("/ai/generate")
 async def generate_ai_response(
     data: AIGenerateInput,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_user),
 ):
-    if user.is_subscribed is False:
+    if await get_is_subscribed(db, user.id) is False:
         text = (
             "Subscription required for AI features"
             if user.language == "en"
             else "Підписка потрібна для використання AI функцій"
         )
         return {"response": text}
-    transactions = await get_transactions(
-        db,
+    end = data.end or date.today()
+    start = data.start or end.replace(day=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= settings.AI_PROMPT_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window exceeds {settings.AI_PROMPT_MAX_DAYS} days",
+        )
+    context = await build_prompt_context(db, user, start, end)
+    AI_PROMPT_TOKENS.observe(context.tokens)
+    AI_PROMPT_BUILD_SECONDS.observe(context.build_ms / 1000)
+    logger.info(
+        "AI prompt for user %s: ~%s tokens, %s lines omitted, built in %.1f ms",
         user.id,
-        start_date=datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        ),
-        end_date=datetime.now(),
-        limit=10000,
-    )
-    transactions_dict = [
-        AnalyticsTransactionForAI.model_validate(tx, by_alias=True).model_dump()
-        for tx in transactions
-    ]
-    prompt = f"""
-    You are a financial assistant. Based on the following transactions, answer the user's question.
-    Transactions:
-    {json.dumps(transactions_dict, indent=2)}
-    """
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    response = client.responses.create(
-        model="gpt-4.1-mini", instructions=prompt, input=data.question
+        context.tokens,
+        context.omitted,
+        context.build_ms,
     )
-    return {"response": response.output_text.replace("\n", " ").strip()}
+    prompt_headers = {
+        "X-Prompt-Tokens": str(context.tokens),
+        "X-Prompt-Build-Ms": f"{context.build_ms:.1f}",
+    }
+    # the model takes seconds: don't hold a pooled connection meanwhile
+    await db.close()
+    if data.stream:
+        return StreamingResponse(
+            _sse_answer(context.text, data.question),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+                **prompt_headers,
+            },
+        )
+    try:
+        answer = await ai_client.answer(context.text, data.question)
+    except OpenAIError as exc:
+        logger.warning("AI answer failed: %s", exc)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY, detail="AI service unavailable"
+        )
+    response.headers.update(prompt_headers)
+    return {"response": answer.replace("\n", " ").strip()}
+
+
+async def _sse_answer(prompt: str, question: str):
+    try:
+        async for delta in ai_client.stream(prompt, question):
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+    except OpenAIError as exc:
+        logger.warning("AI stream failed: %s", exc)
+        yield f"event: error\ndata: {json.dumps({'detail': 'AI service unavailable'})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.api.deps import get_current_user
+from app.core.billing import liqpay_client
+from app.core.cache import analytics_cache
+from app.core.user_cache import user_cache
+from app.db.pool import pool_status
+from app.db.replica import replica_router
+from app.db.session import engine, read_engine
+from app.models import User
+
+router = APIRouter()
+
+
+# Operational endpoints, superusers only
+async def get_superuser(user: User = Depends(get_current_user)) -> User:
+    if not user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return user
+
+
+@router.get("/cache")
+async def cache_stats(user: User = Depends(get_superuser)) -> dict:
+    stats = analytics_cache.stats
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+    }
+
+
+@router.get("/user-cache")
+async def user_cache_stats(user: User = Depends(get_superuser)) -> dict:
+    stats = user_cache.stats
+    lookups = stats["hits"] + stats["redis_hits"] + stats["misses"]
+    return {
+        **stats,
+        "size": len(user_cache),
+        "hit_ratio": (
+            round((stats["hits"] + stats["redis_hits"]) / lookups, 4)
+            if lookups
+            else None
+        ),
+    }
+
+
+@router.get("/pool")
+async def pool_stats(user: User = Depends(get_superuser)) -> dict:
+    return {
+        "primary": pool_status(engine),
+        "replica": pool_status(read_engine) if read_engine is not engine else None,
+        "routing": replica_router.stats,
+    }
+
+
+@router.get("/billing")
+async def billing_stats(user: User = Depends(get_superuser)) -> dict:
+    breaker = liqpay_client.breaker
+    return {
+        **liqpay_client.stats,
+        "circuit": breaker.state,
+        "consecutive_failures": breaker.failed,
+    }
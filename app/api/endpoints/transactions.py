@@ -1,30 +1,70 @@
+import csv
+import io
 from datetime import datetime, timedelta, date
-from typing import List
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from decimal import Decimal
+from typing import List, Literal
+
+import orjson
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.analytics import get_insights
+from app.core.cache import analytics_cache
+from app.core.config import settings
+from app.db.replica import may_cache, read_session_for
 from app.db.session import get_db
+from app.importers import import_statement
 from app.schemas import (
     AnalyticsTransactionOut,
+    CategoryBreakdownOut,
+    InsightsOut,
+    RecurringPatternOut,
+    TimeSeriesOut,
     TransactionCreate,
     TransactionOut,
-    AnalyticsGroupedTransaction,
-    AnalyticsTransaction,
 )
 from app.models import User, Transaction
 from app.crud import (
     create_transaction,
-    get_transactions_amount,
-    get_transactions_by_type,
+    create_transactions,
+    get_category_breakdown,
+    get_dashboard_analytics,
+    get_recurring_patterns,
+    get_transactions_timeseries,
     get_transaction,
     delete_transaction,
-    get_transactions,
-    get_transactions_by_type_grouped,
+    get_transaction_rows,
+    stream_transactions,
+    EXPORT_COLUMNS,
+    TRANSACTION_OUT_COLUMNS,
 )
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_read_db
+from app.tools import decode_cursor, encode_cursor
 
 router = APIRouter()
 
+# keys for get_transaction_rows() rows; the trailing id column is left out
+TRANSACTION_OUT_FIELDS = [column.key for column in TRANSACTION_OUT_COLUMNS[:-1]]
+
+
+def _json_response(content, headers: dict = None) -> Response:
+    # already JSON-shaped data (plain rows, cached dicts): encode with orjson
+    # instead of re-validating it through the response model
+    return Response(
+        orjson.dumps(content), media_type="application/json", headers=headers
+    )
+
 
 @router.post("", response_model=TransactionOut, status_code=status.HTTP_201_CREATED)
 async def create_transaction_endpoint(
@@ -33,13 +73,115 @@ async def create_transaction_endpoint(
     current_user: User = Depends(get_current_user),
 ) -> TransactionOut:
     obj = Transaction(user_id=current_user.id, **transaction.model_dump())
+    # the base currency is read at write time: current_user may be cached
     return await create_transaction(db, obj)
 
 
+@router.post(
+    "/batch", response_model=List[TransactionOut], status_code=status.HTTP_201_CREATED
+)
+async def create_transactions_batch_endpoint(
+    transactions: List[TransactionCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> List[TransactionOut]:
+    if len(transactions) > settings.BATCH_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BATCH_CREATE_MAX_ITEMS} transactions per batch",
+        )
+    return await create_transactions(db, current_user.id, transactions)
+
+
+@router.post("/import")
+async def import_transactions_endpoint(
+    file: UploadFile = File(...),
+    format: Literal["csv", "ofx"] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> dict:
+    """Bulk import a bank statement; each chunk is COPY'd in its own transaction."""
+    if format is None:
+        is_ofx = (file.filename or "").lower().endswith((".ofx", ".qfx"))
+        format = "ofx" if is_ofx else "csv"
+    try:
+        return await import_statement(db, current_user.id, file.file, format)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not parse file: {exc}")
+
+
+EXPORT_HEADER = [column.key for column in EXPORT_COLUMNS]
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _encode_csv(rows: list, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_HEADER)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _json_default(value):
+    # orjson handles datetimes itself
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_ndjson(rows: list) -> bytes:
+    return b"".join(
+        orjson.dumps(
+            dict(zip(EXPORT_HEADER, row)),
+            default=_json_default,
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for row in rows
+    )
+
+
+@router.get("/export")
+async def export_transactions_endpoint(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: date = None,
+    end: date = None,
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    user_id = current_user.id
+
+    async def body():
+        # own session: the response outlives the request-scoped one
+        async with read_session_for(user_id) as db:
+            if format == "csv":
+                yield _encode_csv([], header=True)
+            async for rows in stream_transactions(
+                db, user_id, start_date=start, end_date=end
+            ):
+                yield _encode_csv(rows) if format == "csv" else _encode_ndjson(rows)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{format}"'
+        },
+    )
+
+
+@router.get("/insights", response_model=InsightsOut)
+async def get_insights_endpoint(
+    days: int = Query(30, ge=7, le=settings.INSIGHTS_MAX_DAYS),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    return _json_response(await get_insights(db, current_user, days))
+
+
 @router.get("/{tx_id}", response_model=TransactionOut)
 async def get_transaction_endpoint(
     tx_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> TransactionOut:
     obj = await get_transaction(db, tx_id, current_user.id)
@@ -55,14 +197,21 @@ async def get_transactions_endpoint(
     page: int = 0,
     limit: int = 100,
     order: str = "desc",
-    db: AsyncSession = Depends(get_db),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> List[TransactionOut]:
+    # `cursor` (from the X-Next-Cursor header of the previous page) takes
+    # precedence over `page`, which is kept for older clients
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     start = start or datetime.now().replace(
         day=1, hour=0, minute=0, second=0, microsecond=0
     )
     end = end or datetime.now()
-    return await get_transactions(
+    rows = await get_transaction_rows(
         db,
         current_user.id,
         start_date=start,
@@ -70,94 +219,197 @@ async def get_transactions_endpoint(
         skip=page * limit,
         limit=limit,
         order=order,
+        after=after,
+    )
+    headers = {}
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.tx_date, last.id)
+    return _json_response(
+        [dict(zip(TRANSACTION_OUT_FIELDS, row)) for row in rows], headers
     )
 
 
 @router.get("/dashboard/analytics", response_model=AnalyticsTransactionOut)
 async def get_transactions_analytics(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> AnalyticsTransactionOut:
-    start_date = datetime.now().replace(
-        hour=0, minute=0, second=0, microsecond=0, day=1
-    )
-    end_date = datetime.now()
-    income_last_transactions = await get_transactions_by_type(
-        db,
-        user_id=current_user.id,
-        tx_type="income",
-        start_date=start_date,
-        end_date=end_date,
-        limit=5,
-    )
-    expense_last_transactions = await get_transactions_by_type(
-        db,
-        user_id=current_user.id,
-        tx_type="expense",
-        start_date=start_date,
-        end_date=end_date,
-        limit=5,
-    )
-    all_income_transactions = await get_transactions_by_type_grouped(
-        db=db,
-        user_id=current_user.id,
-        tx_type="income",
-    )
-    all_expense_transactions = await get_transactions_by_type_grouped(
-        db=db,
-        user_id=current_user.id,
-        tx_type="expense",
-    )
-    income_today_amount = await get_transactions_amount(
-        db=db,
-        user_id=current_user.id,
-        tx_type="income",
-        start_date=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
-        end_date=end_date,
+    now = datetime.now()
+
+    async def compute() -> dict:
+        analytics = await get_dashboard_analytics(
+            db,
+            user_id=current_user.id,
+            month_start=now.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+            today_start=now.replace(hour=0, minute=0, second=0, microsecond=0),
+            end_date=now,
+            last_limit=5,
+        )
+        return AnalyticsTransactionOut.model_validate(analytics).model_dump(
+            mode="json", by_alias=True
+        )
+
+    return _json_response(
+        await analytics_cache.get_or_compute(
+            current_user.id,
+            f"dashboard:{now:%Y-%m-%d}",
+            compute,
+            store=may_cache(db),
+        )
     )
-    expense_today_amount = await get_transactions_amount(
-        db=db,
-        user_id=current_user.id,
-        tx_type="expense",
-        start_date=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
-        end_date=end_date,
+
+
+# rough bucket lengths in days, only used to bound the requested window
+BUCKET_DAYS = {"day": 1, "week": 7, "month": 28, "year": 365}
+
+
+@router.get("/dashboard/timeseries", response_model=TimeSeriesOut)
+async def get_transactions_timeseries_endpoint(
+    start: date = None,
+    end: date = None,
+    bucket: Literal["day", "week", "month", "year"] = "day",
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> TimeSeriesOut:
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days // BUCKET_DAYS[bucket] >= settings.TIMESERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window exceeds {settings.TIMESERIES_MAX_BUCKETS} {bucket} buckets",
+        )
+
+    async def compute() -> dict:
+        points = await get_transactions_timeseries(
+            db, current_user.id, start, end, bucket
+        )
+        return TimeSeriesOut(
+            bucket=bucket,
+            start=start,
+            end=end,
+            points=[
+                {"date": point.bucket, "income": point.income, "expense": point.expense}
+                for point in points
+            ],
+        ).model_dump(mode="json", by_alias=True)
+
+    return _json_response(
+        await analytics_cache.get_or_compute(
+            current_user.id,
+            f"timeseries:{bucket}:{start}:{end}",
+            compute,
+            store=may_cache(db),
+        )
     )
-    income_month_amount = await get_transactions_amount(
-        db=db,
-        user_id=current_user.id,
-        tx_type="income",
-        start_date=start_date,
-        end_date=end_date,
+
+
+def _shape_breakdown(rows: list, top: int = None) -> tuple:
+    """Turn GROUPING SETS rows into (totals, category items sorted by amount)."""
+    totals = {}
+    amounts = {}
+    for row in rows:
+        if row.is_total:
+            totals[(row.period, row.type)] = float(row.amount)
+        else:
+            amounts[(row.period, row.type, row.category)] = (
+                float(row.amount),
+                int(row.count),
+            )
+
+    items = []
+    for (period, tx_type, category), (amount, count) in list(amounts.items()):
+        if period != "current":
+            continue
+        previous, _ = amounts.pop(("previous", tx_type, category), (0.0, 0))
+        type_total = totals.get(("current", tx_type)) or 0.0
+        items.append(
+            {
+                "type": tx_type,
+                "category": category or None,
+                "amount": amount,
+                "count": count,
+                "share": round(amount / type_total, 4) if type_total else 0.0,
+                "previous_amount": previous,
+                "delta": round(amount - previous, 2),
+                "delta_pct": (
+                    round((amount - previous) / previous, 4) if previous else None
+                ),
+            }
+        )
+    # categories that had spending only in the previous period
+    for (period, tx_type, category), (amount, _) in amounts.items():
+        if period == "previous":
+            items.append(
+                {
+                    "type": tx_type,
+                    "category": category or None,
+                    "amount": 0.0,
+                    "count": 0,
+                    "share": 0.0,
+                    "previous_amount": amount,
+                    "delta": -amount,
+                    "delta_pct": -1.0,
+                }
+            )
+
+    items.sort(
+        key=lambda item: (item["type"], -item["amount"], -item["previous_amount"])
     )
-    expense_month_amount = await get_transactions_amount(
-        db=db,
-        user_id=current_user.id,
-        tx_type="expense",
-        start_date=start_date,
-        end_date=end_date,
+    if top:
+        ranked = {}
+        for item in items:
+            ranked.setdefault(item["type"], []).append(item)
+        items = [item for group in ranked.values() for item in group[:top]]
+    return totals, items
+
+
+@router.get("/dashboard/categories", response_model=CategoryBreakdownOut)
+async def get_category_breakdown_endpoint(
+    start: date = None,
+    end: date = None,
+    type: Literal["income", "expense"] = None,
+    top: int = Query(None, ge=1),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> CategoryBreakdownOut:
+    end = end or date.today()
+    start = start or end.replace(day=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    async def compute() -> dict:
+        rows = await get_category_breakdown(db, current_user.id, start, end, type)
+        totals, items = _shape_breakdown(rows, top)
+        return CategoryBreakdownOut(
+            start=start,
+            end=end,
+            income_total=totals.get(("current", "income"), 0.0),
+            expense_total=totals.get(("current", "expense"), 0.0),
+            previous_income_total=totals.get(("previous", "income"), 0.0),
+            previous_expense_total=totals.get(("previous", "expense"), 0.0),
+            categories=items,
+        ).model_dump(mode="json")
+
+    return _json_response(
+        await analytics_cache.get_or_compute(
+            current_user.id,
+            f"categories:{type}:{top}:{start}:{end}",
+            compute,
+            store=may_cache(db),
+        )
     )
-    return {
-        "last_income_transactions": [
-            AnalyticsTransaction.model_validate(tx, by_alias=True)
-            for tx in income_last_transactions
-        ],
-        "last_expense_transactions": [
-            AnalyticsTransaction.model_validate(tx, by_alias=True)
-            for tx in expense_last_transactions
-        ],
-        "all_income_transactions": [
-            AnalyticsGroupedTransaction.model_validate(tx, by_alias=True)
-            for tx in all_income_transactions
-        ],
-        "all_expense_transactions": [
-            AnalyticsGroupedTransaction.model_validate(tx, by_alias=True)
-            for tx in all_expense_transactions
-        ],
-        "income_today_amount": income_today_amount,
-        "expense_today_amount": expense_today_amount,
-        "income_month_amount": income_month_amount,
-        "expense_month_amount": expense_month_amount,
-    }
+
+
+@router.get("/dashboard/recurring", response_model=List[RecurringPatternOut])
+async def get_recurring_patterns_endpoint(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> List[RecurringPatternOut]:
+    # precomputed by the detect_recurring_transactions Celery job
+    return await get_recurring_patterns(db, current_user.id)
 
 
 @router.delete("/{tx_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,81 @@
+from typing import AsyncIterator, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+
+class AIClient:
+    """Process-wide ``AsyncOpenAI`` client on one pooled HTTP client.
+
+    ``start``/``close`` belong in the app lifespan; the client is created on
+    first use otherwise. ``OPENAI_BASE_URL`` points it at another
+    Responses-compatible server, e.g. scripts/fake_openai.py.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str],
+        timeout: float,
+        max_retries: int,
+        max_connections: int,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        self.start()
+        return self._client
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(limits=self.limits),
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def answer(self, instructions: str, question: str) -> str:
+        response = await self.client.responses.create(
+            model=self.model, instructions=instructions, input=question
+        )
+        return response.output_text
+
+    async def stream(self, instructions: str, question: str) -> AsyncIterator[str]:
+        """Text deltas of the answer as the model produces them."""
+        stream = await self.client.responses.create(
+            model=self.model, instructions=instructions, input=question, stream=True
+        )
+        async with stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+
+
+ai_client = AIClient(
+    settings.OPENAI_API_KEY,
+    model=settings.OPENAI_MODEL,
+    base_url=settings.OPENAI_BASE_URL,
+    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+)
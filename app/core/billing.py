@@ -1,15 +1,24 @@
+import asyncio
 import base64
 from datetime import datetime
 import json
 import hashlib
 import hmac
+import logging
 import os
+import random
+import time
+from typing import Optional
+
+import httpx
+
 from app.core.config import settings
-import requests
+
+logger = logging.getLogger(__name__)
 
 LIQPAY_PUBLIC_KEY = settings.LIQPAY_PUBLIC_KEY
 LIQPAY_PRIVATE_KEY = settings.LIQPAY_PRIVATE_KEY
-API_URL = "https://www.liqpay.ua/api/request"
+API_URL = settings.LIQPAY_API_URL
 
 
 def generate_signature(data: str) -> str:
@@ -52,24 +61,203 @@ def create_payment_data(
     return {"data": data_encoded, "signature": signature}
 
 
-def cancel_subscription(order_id: str):
-    payload = {
-        "action": "unsubscribe",
-        "version": 3,
-        "public_key": LIQPAY_PUBLIC_KEY,
-        "order_id": order_id,
-    }
-
+def encode_request(payload: dict) -> dict:
     json_str = json.dumps(payload, separators=(",", ":"))  # важливо: без пробілів
     data_encoded = base64.b64encode(json_str.encode("utf-8")).decode("utf-8")
+    return {"data": data_encoded, "signature": generate_signature(data_encoded)}
 
-    signature = generate_signature(data_encoded)
 
-    response = requests.post(
-        API_URL,
-        data={
-            "data": data_encoded,
-            "signature": signature,
-        },
+def event_key(data: dict) -> str:
+    """Identity of a LiqPay callback: redeliveries of it map to the same key."""
+    source = (
+        data.get("payment_id") or data.get("liqpay_order_id") or data.get("order_id")
     )
-    return response.json()
+    return f"{source}:{data.get('action')}:{data.get('status')}"
+
+
+def subscription_changes(data: dict) -> Optional[dict]:
+    """User fields a LiqPay callback changes, None for statuses we ignore."""
+    status = data.get("status")
+    action = data.get("action")
+    if (status == "subscribed" and action == "subscribe") or (
+        action in ["pay", "subscribe"] and status == "success"
+    ):
+        return {
+            "is_subscribed": True,
+            "subscription_start": datetime.fromtimestamp(
+                data.get("create_date") / 1000
+            ),
+            "subscription_end": datetime.fromtimestamp(data.get("end_date") / 1000),
+            "subscription_id": data.get("liqpay_order_id"),
+            "cancel_at_period_end": False,
+            "liqpay_order_id": data.get("liqpay_order_id"),
+            "order_id": data.get("order_id"),
+        }
+    if action == "subscribe" and status == "unsubscribed":
+        return {"cancel_at_period_end": True}
+    if action in ["pay", "subscribe"] and status in ["failure", "error", "reversed"]:
+        return {"is_subscribed": False, "subscription_id": data.get("liqpay_order_id")}
+    return None
+
+
+class LiqPayError(Exception):
+    """LiqPay couldn't be reached or refused the request."""
+
+
+class CircuitOpenError(LiqPayError):
+    """Calls are short-circuited after repeated LiqPay failures."""
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failed calls. Once ``reset_after``
+    seconds have passed, one trial call goes through (the circuit stays open
+    for everyone else) and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failures: int, reset_after: float):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.failed = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError("LiqPay circuit is open")
+        if state == "half-open":
+            self.opened_at = time.monotonic()
+
+    def succeeded(self) -> None:
+        self.failed = 0
+        self.opened_at = None
+
+    def failed_call(self) -> None:
+        self.failed += 1
+        if self.opened_at is None and self.failed >= self.failures:
+            logger.warning("LiqPay circuit opened after %s failures", self.failed)
+            self.opened_at = time.monotonic()
+        elif self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class LiqPayClient:
+    """LiqPay API client on one pooled ``httpx.AsyncClient``.
+
+    Each attempt is bounded by the timeouts; connection errors, timeouts and
+    5xx/429 answers are retried with exponential backoff. A call that fails
+    for good counts towards the circuit breaker, which then fails calls fast
+    instead of tying up requests on a LiqPay outage. ``start``/``close``
+    belong in the app lifespan; the HTTP client is created on first use
+    otherwise (Celery, scripts).
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float,
+        connect_timeout: float,
+        max_connections: int,
+        retries: int,
+        backoff: float,
+        breaker: CircuitBreaker,
+    ):
+        self.url = url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, form: dict) -> dict:
+        self.start()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                delay = self.backoff * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            try:
+                response = await self._client.post(self.url, data=form)
+            except (httpx.TimeoutException, httpx.TransportError) as exc:
+                error = f"{type(exc).__name__} {exc}".strip()
+                continue
+            if response.status_code in self.RETRY_STATUSES:
+                error = f"HTTP {response.status_code}"
+                continue
+            if response.is_error:
+                raise LiqPayError(f"HTTP {response.status_code}: {response.text[:200]}")
+            try:
+                return response.json()
+            except ValueError:
+                raise LiqPayError(f"Invalid LiqPay answer: {response.text[:200]}")
+        raise LiqPayError(
+            f"LiqPay unavailable after {self.retries + 1} attempts: {error}"
+        )
+
+    async def request(self, payload: dict) -> dict:
+        """Send a signed API request; the decoded answer when ``result`` is ok."""
+        self.stats["calls"] += 1
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats["short_circuited"] += 1
+            raise
+        try:
+            answer = await self._post(encode_request(payload))
+        except LiqPayError:
+            self.stats["failures"] += 1
+            self.breaker.failed_call()
+            raise
+        # LiqPay answered: whatever it said, the service itself is up
+        self.breaker.succeeded()
+        if answer.get("result") == "error":
+            raise LiqPayError(
+                f"{answer.get('err_code')}: {answer.get('err_description')}"
+            )
+        return answer
+
+    async def cancel_subscription(self, order_id: str) -> dict:
+        return await self.request(
+            {
+                "action": "unsubscribe",
+                "version": 3,
+                "public_key": LIQPAY_PUBLIC_KEY,
+                "order_id": order_id,
+            }
+        )
+
+
+liqpay_client = LiqPayClient(
+    API_URL,
+    timeout=settings.LIQPAY_TIMEOUT_SECONDS,
+    connect_timeout=settings.LIQPAY_CONNECT_TIMEOUT_SECONDS,
+    max_connections=settings.LIQPAY_MAX_CONNECTIONS,
+    retries=settings.LIQPAY_RETRIES,
+    backoff=settings.LIQPAY_RETRY_BACKOFF_SECONDS,
+    breaker=CircuitBreaker(
+        settings.LIQPAY_BREAKER_FAILURES, settings.LIQPAY_BREAKER_RESET_SECONDS
+    ),
+)
@@ -0,0 +1,149 @@
+import json
+import logging
+import time
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Values are stored under analytics:{user_id}:{version}:{period}. Every write
+# to a user's transactions bumps analytics:v:{user_id}, so readers move on to
+# a new key and stale entries simply age out through their TTL.
+VERSION_KEY = "analytics:v:{user_id}"
+VALUE_KEY = "analytics:{user_id}:{version}:{period}"
+
+# Reads the version and the value for it in a single round trip.
+GET_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+"""
+
+# payloads above this size are zlib-compressed, marked by the first byte
+COMPRESS_THRESHOLD = 1024
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    raw = json.dumps(value, separators=(",", ":"), default=_json_default).encode()
+    if len(raw) > COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(raw)
+    return b"j" + raw
+
+
+def loads(payload: bytes) -> Any:
+    raw = zlib.decompress(payload[1:]) if payload[:1] == b"z" else payload[1:]
+    return json.loads(raw)
+
+
+class AnalyticsCache:
+    """Per-user cache for analytics results with version-based invalidation.
+
+    Redis problems never fail a request: the call is treated as a miss (or a
+    no-op for writes) and Redis is skipped for ``retry_after`` seconds.
+    """
+
+    def __init__(self, url: str, ttl: int, retry_after: float, enabled: bool = True):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "errors": 0, "bypassed": 0}
+        self._down_until = 0.0
+        self._redis = aioredis.from_url(
+            url, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        self._get_script = self._redis.register_script(GET_SCRIPT)
+
+    def _available(self) -> bool:
+        if not self.enabled or time.monotonic() < self._down_until:
+            self.stats["bypassed"] += 1
+            return False
+        return True
+
+    def _failed(self, exc: Exception) -> None:
+        self.stats["errors"] += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning("Analytics cache unavailable, bypassing: %s", exc)
+
+    async def get(self, user_id: int, period: str) -> tuple:
+        """Return (version, value); value is None on a miss."""
+        if not self._available():
+            return None, None
+        try:
+            version, payload = await self._get_script(
+                keys=[VERSION_KEY.format(user_id=user_id)],
+                args=[f"analytics:{user_id}:", f":{period}"],
+            )
+        except (RedisError, OSError) as exc:
+            self._failed(exc)
+            return None, None
+        version = int(version)
+        if payload is None:
+            self.stats["misses"] += 1
+            return version, None
+        self.stats["hits"] += 1
+        return version, loads(payload)
+
+    async def set(self, user_id: int, version: int, period: str, value: Any) -> None:
+        if version is None or not self._available():
+            return
+        key = VALUE_KEY.format(user_id=user_id, version=version, period=period)
+        try:
+            await self._redis.set(key, dumps(value), ex=self.ttl)
+        except (RedisError, OSError) as exc:
+            self._failed(exc)
+
+    async def get_or_compute(
+        self,
+        user_id: int,
+        period: str,
+        compute: Callable[[], Awaitable[Any]],
+        store: bool = True,
+    ) -> Any:
+        """Cached value for (user, period), computing and storing it on a miss.
+
+        ``compute`` must return something JSON-serializable; the version is
+        read before computing, so a write racing with us only leaves an
+        entry behind that nobody reads. ``store=False`` serves hits but keeps
+        a freshly computed value out of the cache.
+        """
+        version, value = await self.get(user_id, period)
+        if value is not None:
+            return value
+        value = await compute()
+        if store:
+            await self.set(user_id, version, period, value)
+        return value
+
+    async def bump(self, user_id: int) -> None:
+        """Invalidate everything cached for the user."""
+        if not self._available():
+            return
+        try:
+            await self._redis.incr(VERSION_KEY.format(user_id=user_id))
+        except (RedisError, OSError) as exc:
+            self._failed(exc)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+analytics_cache = AnalyticsCache(
+    settings.REDIS_URL,
+    ttl=settings.CACHE_TTL_SECONDS,
+    retry_after=settings.CACHE_RETRY_AFTER_SECONDS,
+    enabled=settings.CACHE_ENABLED,
+)
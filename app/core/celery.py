@@ -1,11 +1,12 @@
 from celery import Celery
+from celery.schedules import crontab
 import os
 
 celery_app = Celery(
     "crm",
     broker=os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"),
     backend=os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/1"),
-    include=[],
+    include=["app.tasks"],
 )
 
 celery_app.conf.update(
@@ -14,4 +15,26 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="Europe/Kyiv",
     enable_utc=True,
+    beat_schedule={
+        "load-fx-rates": {
+            "task": "app.tasks.load_fx_rates",
+            "schedule": crontab(hour=2, minute=0),
+        },
+        "ensure-transaction-partitions": {
+            "task": "app.tasks.ensure_transaction_partitions",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        "detect-recurring-transactions": {
+            "task": "app.tasks.detect_recurring_transactions",
+            "schedule": crontab(hour=4, minute=0),
+        },
+        "retry-pending-payment-events": {
+            "task": "app.tasks.retry_pending_payment_events",
+            "schedule": crontab(minute="*/5"),
+        },
+        "expire-lapsed-subscriptions": {
+            "task": "app.tasks.expire_lapsed_subscriptions",
+            "schedule": crontab(minute="*/15"),
+        },
+    },
 )
@@ -1,17 +1,60 @@
+import os
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = Field(
         default="postgresql+asyncpg://crm_user:crm_pass@db:5432/crm"
     )
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # seconds before a connection is replaced; -1 keeps them forever
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_USE_LIFO: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # behind PgBouncer in transaction mode: no prepared statement caching
+    DB_PGBOUNCER: bool = False
+    DB_ECHO: bool = False
+    # read-only endpoints use this server when set (same DB_* pool options)
+    DATABASE_REPLICA_URL: Optional[str] = None
+    # after a user's write, their reads stay on the primary this long; keep it
+    # above the replica's usual lag
+    REPLICA_STALENESS_SECONDS: float = 5.0
+    # for this long after that, replica reads are served but not put in the
+    # analytics cache, so a lagging replica can't cache a stale result
+    REPLICA_CACHE_GRACE_SECONDS: float = 60.0
+    # Prometheus /metrics and per-request SQL stats
+    METRICS_ENABLED: bool = True
+    # log the slowest statement of requests that ran one this slow
+    METRICS_SLOW_QUERY_MS: float = 200.0
+    # add a Server-Timing header with the request's query count and DB time
+    METRICS_SERVER_TIMING: bool = False
     REDIS_URL: str = Field(default="redis://redis:6379/0")
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: int = 600
+    CACHE_RETRY_AFTER_SECONDS: float = 30.0
+    USER_CACHE_SIZE: int = 10000
+    # how stale another process' copy of a user may get after an update
+    USER_CACHE_TTL_SECONDS: int = 30
+    # share cached users between processes through Redis
+    USER_CACHE_REDIS: bool = False
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
     SECRET_KEY: str = Field(default="super-secret")
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000"]
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 365
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # bcrypt work factor; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS: int = 12
+    # threads hashing passwords at once per process; more than the CPU count
+    # only takes CPU away from the event loop
+    PASSWORD_HASH_WORKERS: int = Field(
+        default_factory=lambda: min(4, os.cpu_count() or 1)
+    )
     CURRENCY_CHOICES: List[str] = ["USD", "UAH"]
     CATEGORY_CHOICES_EXPENSE: List[str] = [
         "Food",
@@ -34,7 +77,61 @@ class Settings(BaseSettings):
     SERVER_URL: str = Field(default="https://your-ngrok-url.ngrok.io")
     LIQPAY_PUBLIC_KEY: str = Field(default="your_public_key")
     LIQPAY_PRIVATE_KEY: str = Field(default="your_private_key")
+    LIQPAY_API_URL: str = "https://www.liqpay.ua/api/request"
+    LIQPAY_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    # whole request, per attempt
+    LIQPAY_TIMEOUT_SECONDS: float = 10.0
+    LIQPAY_MAX_CONNECTIONS: int = 20
+    LIQPAY_RETRIES: int = 2
+    # doubled on every retry, with jitter
+    LIQPAY_RETRY_BACKOFF_SECONDS: float = 0.5
+    # consecutive failed calls that open the circuit, and how long it stays open
+    LIQPAY_BREAKER_FAILURES: int = 5
+    LIQPAY_BREAKER_RESET_SECONDS: float = 30.0
+    # stored webhook events still unapplied after this long are re-queued
+    PAYMENT_EVENTS_RETRY_AFTER_SECONDS: int = 120
+    # users unsubscribed per UPDATE by the expiry sweep
+    SUBSCRIPTION_EXPIRY_BATCH: int = 5000
+    # time a renewal callback gets to arrive after subscription_end
+    SUBSCRIPTION_EXPIRY_GRACE_HOURS: int = 12
+    SUBSCRIPTION_EXPIRY_NOTIFY: bool = True
+    # Telegram allows about 30 messages per second per bot
+    TELEGRAM_MESSAGES_PER_SECOND: int = 25
     OPENAI_API_KEY: str = Field(default="your_openai_api_key")
+    OPENAI_MODEL: str = "gpt-4.1-mini"
+    # another Responses-compatible server, e.g. scripts/fake_openai.py
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_MAX_CONNECTIONS: int = 50
+    # size limit of the finance summary sent with every AI question
+    AI_PROMPT_MAX_TOKENS: int = 2000
+    AI_PROMPT_RECENT_ROWS: int = 20
+    AI_PROMPT_TOP_CATEGORIES: int = 10
+    AI_PROMPT_MAX_DAYS: int = 366
+    IMPORT_CHUNK_SIZE: int = 5000
+    BATCH_CREATE_MAX_ITEMS: int = 500
+    TIMESERIES_MAX_BUCKETS: int = 1000
+    FX_QUOTE_CURRENCY: str = "USD"
+    # "file" or a "package.module:ProviderClass" path
+    FX_PROVIDER: str = "file"
+    FX_RATES_FILE: str = "fx_rates.csv"
+    FX_CACHE_TTL_SECONDS: int = 3600
+    # a missing rate is re-checked soon: it may be loaded any moment
+    FX_MISS_TTL_SECONDS: int = 60
+    TRANSACTIONS_PARTITIONS_AHEAD: int = 3
+    IMPORT_MAX_ERRORS: int = 1000
+    INSIGHTS_MAX_DAYS: int = 365
+    # history the per-category anomaly baseline is computed over
+    INSIGHTS_HISTORY_DAYS: int = 180
+    INSIGHTS_ZSCORE_THRESHOLD: float = 3.0
+    INSIGHTS_MIN_CATEGORY_SIZE: int = 5
+    INSIGHTS_MAX_ANOMALIES: int = 10
+    RECURRING_LOOKBACK_DAYS: int = 400
+    RECURRING_MIN_OCCURRENCES: int = 4
+    RECURRING_BATCH_USERS: int = 500
+    # parallel scan tasks, each holding one DB connection while it runs
+    RECURRING_SHARDS: int = 4
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,181 @@
+import csv
+import importlib
+import json
+import logging
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterable, Optional, Protocol, Tuple
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import FxRate
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+RateRow = Tuple[date, str, Decimal]
+
+
+class FxRateProvider(Protocol):
+    """Source of daily rates: value of one `currency` unit in the quote currency."""
+
+    def fetch(self, start: date, end: date) -> Iterable[RateRow]: ...
+
+
+class FileFxRateProvider:
+    """Reads rates from a local CSV (day,currency,rate) or JSON list file."""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.FX_RATES_FILE)
+
+    def fetch(self, start: date, end: date) -> Iterable[RateRow]:
+        with self.path.open(encoding="utf-8") as file:
+            if self.path.suffix == ".json":
+                rows = json.load(file)
+            else:
+                rows = csv.DictReader(file)
+            for row in rows:
+                day = date.fromisoformat(row["day"])
+                if start <= day <= end:
+                    yield day, row["currency"].upper(), Decimal(str(row["rate"]))
+
+
+def get_provider(name: str = None) -> FxRateProvider:
+    name = name or settings.FX_PROVIDER
+    if name == "file":
+        return FileFxRateProvider()
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+async def load_rates(
+    db: AsyncSession, provider: FxRateProvider, start: date, end: date
+) -> int:
+    """Upsert the provider's rates for [start, end] into `fx_rates`."""
+    rows = [
+        {"day": day, "currency": currency, "rate": rate}
+        for day, currency, rate in provider.fetch(start, end)
+    ]
+    if not rows:
+        return 0
+    stmt = pg_insert(FxRate)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["currency", "day"], set_={"rate": stmt.excluded.rate}
+    )
+    await db.execute(stmt, rows)
+    await db.commit()
+    return len(rows)
+
+
+def rate_expression(currency, day):
+    """SQL for the latest known rate of `currency` on or before `day`."""
+    latest = (
+        select(FxRate.rate)
+        .where(FxRate.currency == currency, FxRate.day <= day)
+        .order_by(FxRate.day.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return case(
+        (currency == settings.FX_QUOTE_CURRENCY, literal(Decimal(1))), else_=latest
+    )
+
+
+class FxConverter:
+    """Converts amounts between currencies with an in-process rate cache.
+
+    Rates are looked up as of the transaction day (latest rate on or before
+    it) and kept for ``ttl`` seconds, so a warm process converts without
+    touching the database. Missing rates are kept for ``miss_ttl`` seconds
+    only, so conversions pick up rates loaded after the first lookup.
+    """
+
+    def __init__(self, quote: str, ttl: int, miss_ttl: int):
+        self.quote = quote
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._rates = {}
+
+    def _cached(self, currency: str, day: date):
+        entry = self._rates.get((currency, day))
+        if entry and entry[1] > time.monotonic():
+            return entry
+        return None
+
+    def _store(self, currency: str, day: date, rate: Optional[Decimal]) -> None:
+        ttl = self.ttl if rate is not None else self.miss_ttl
+        self._rates[(currency, day)] = (rate, time.monotonic() + ttl)
+
+    async def rate(
+        self, db: AsyncSession, currency: str, day: date
+    ) -> Optional[Decimal]:
+        if currency == self.quote:
+            return Decimal(1)
+        entry = self._cached(currency, day)
+        if entry:
+            return entry[0]
+        result = await db.execute(
+            select(FxRate.rate)
+            .where(FxRate.currency == currency, FxRate.day <= day)
+            .order_by(FxRate.day.desc())
+            .limit(1)
+        )
+        rate = result.scalar()
+        self._store(currency, day, rate)
+        return rate
+
+    async def warm(
+        self, db: AsyncSession, currencies: Iterable[str], start: date, end: date
+    ) -> None:
+        """Prefetch every day of [start, end] with one query per currency."""
+        for currency in set(currencies) - {self.quote}:
+            # the window starts at the last rate known on `start`, if any
+            as_of_start = (
+                select(FxRate.day)
+                .where(FxRate.currency == currency, FxRate.day <= start)
+                .order_by(FxRate.day.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                select(FxRate.day, FxRate.rate)
+                .where(
+                    FxRate.currency == currency,
+                    FxRate.day <= end,
+                    FxRate.day >= func.coalesce(as_of_start, start),
+                )
+                .order_by(FxRate.day)
+            )
+            known = dict(result.all())
+            rate = None
+            day = min(known, default=start)
+            while day <= end:
+                rate = known.get(day, rate)
+                if day >= start:
+                    self._store(currency, day, rate)
+                day += timedelta(days=1)
+
+    async def convert(
+        self, db: AsyncSession, amount, currency: str, base: str, day: date
+    ) -> Optional[Decimal]:
+        amount = Decimal(str(amount))
+        if currency == base:
+            return amount
+        source = await self.rate(db, currency, day)
+        target = await self.rate(db, base, day)
+        if source is None or target is None:
+            logger.warning("No FX rate for %s->%s on %s", currency, base, day)
+            return None
+        return (amount * source / target).quantize(CENT)
+
+
+fx_converter = FxConverter(
+    settings.FX_QUOTE_CURRENCY,
+    settings.FX_CACHE_TTL_SECONDS,
+    settings.FX_MISS_TTL_SECONDS,
+)
@@ -0,0 +1,238 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.db.pool import pool_status
+
+logger = logging.getLogger(__name__)
+
+# Per-request SQL stats: engine event hooks add every statement to the
+# QueryStats of the request being served (if any), MetricsMiddleware turns
+# them into per-route histograms once the response is done.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL statements while serving a request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+REQUEST_SLOWEST_QUERY = Histogram(
+    "db_slowest_query_per_request_seconds",
+    "Duration of the slowest SQL statement of a request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of single SQL statements, requests and background jobs alike",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+AI_PROMPT_TOKENS = Histogram(
+    "ai_prompt_tokens",
+    "Estimated tokens of the instructions sent with an AI question",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 8000, 16000),
+)
+AI_PROMPT_BUILD_SECONDS = Histogram(
+    "ai_prompt_build_seconds",
+    "Time spent building the instructions of an AI question",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+
+
+request_queries: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # one value, not a stack: a failed statement never reaches
+    # after_cursor_execute, and the next one simply overwrites its start
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    QUERY_DURATION.observe(duration)
+    stats = request_queries.get()
+    if stats is not None:
+        stats.add(statement, duration)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement `engine` (sync or async) executes."""
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope) -> str:
+    """Path with its parameters put back as ``{name}``, e.g. ``/api/x/{tx_id}``.
+
+    Included routers' routes don't know their prefix, so the template is
+    rebuilt from the matched path; the raw path would blow up label
+    cardinality.
+    """
+    if "route" not in scope:
+        return "unmatched"
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        f"{{{names[part]}}}" if part in names else part
+        for part in scope["path"].split("/")
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL stats per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.METRICS_SERVER_TIMING:
+                    header = (
+                        f'db;dur={stats.total * 1000:.2f};desc="{stats.count} queries"'
+                    )
+                    message.setdefault("headers", []).append(
+                        (b"server-timing", header.encode())
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_queries.reset(token)
+            elapsed = time.perf_counter() - started
+            path = route_template(scope)
+            REQUEST_LATENCY.labels(scope["method"], path, status).observe(elapsed)
+            REQUEST_QUERIES.labels(path).observe(stats.count)
+            REQUEST_DB_TIME.labels(path).observe(stats.total)
+            REQUEST_SLOWEST_QUERY.labels(path).observe(stats.slowest)
+            if stats.slowest * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+                logger.warning(
+                    "Slow query on %s %s (%.1f ms of %d queries, %.1f ms total): %s",
+                    scope["method"],
+                    path,
+                    stats.slowest * 1000,
+                    stats.count,
+                    stats.total * 1000,
+                    " ".join(stats.slowest_statement.split())[:500],
+                )
+
+
+class PoolCollector:
+    """Exports pool_status() of the given engines at scrape time.
+
+    Every worker process has pools of its own, so with
+    PROMETHEUS_MULTIPROC_DIR set the series also carry a ``pid`` label.
+    """
+
+    GAUGES = ("size", "checked_out", "checked_in", "overflow", "wait_ms_max")
+    COUNTERS = ("checkouts", "timeouts")
+
+    def __init__(self, engines: dict):
+        self.engines = engines
+
+    def collect(self):
+        labels, values = ["db"], []
+        if _multiprocess():
+            labels.append("pid")
+            values.append(str(os.getpid()))
+        gauges = {
+            name: GaugeMetricFamily(f"db_pool_{name}", f"Pool {name}", labels=labels)
+            for name in self.GAUGES
+        }
+        counters = {
+            name: CounterMetricFamily(f"db_pool_{name}", f"Pool {name}", labels=labels)
+            for name in self.COUNTERS
+        }
+        for db, engine in self.engines.items():
+            status = pool_status(engine)
+            for name, family in {**gauges, **counters}.items():
+                if status.get(name) is not None:
+                    family.add_metric([db, *values], status[name])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+# live collectors, also exported by the per-scrape multiprocess registry
+_collectors = []
+
+
+def _multiprocess() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def register_pool_collector(engines: dict) -> None:
+    collector = PoolCollector(engines)
+    REGISTRY.register(collector)
+    _collectors.append(collector)
+
+
+def render_metrics() -> tuple:
+    """(body, content type) of everything registered, across worker processes
+    when PROMETHEUS_MULTIPROC_DIR is set. Pool metrics then describe the
+    process that answered the scrape."""
+    registry = REGISTRY
+    if _multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _collectors:
+            registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,9 +1,22 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt takes 100+ ms per call and releases the GIL: run it on a small
+# thread pool so logins neither block the event loop nor pile up unbounded
+# CPU work (extra calls wait in the pool's queue)
+hashing_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 def verify_password(plain_password, hashed_password):
@@ -14,6 +27,32 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hashing_executor, pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash was made
+    with other parameters (e.g. fewer BCRYPT_ROUNDS) and should be replaced.
+    """
+    if not hashed_password:
+        return False, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        hashing_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
+def token_claims(user) -> dict:
+    # uid/ver let get_current_user authenticate from its cache, without a query
+    return {"sub": user.email, "uid": user.id, "ver": user.token_version}
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (
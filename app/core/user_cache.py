@@ -0,0 +1,160 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = "user:{user_id}"
+
+USER_FIELDS = [attr.key for attr in inspect(User).column_attrs]
+DATETIME_FIELDS = {
+    attr.key
+    for attr in inspect(User).column_attrs
+    if isinstance(attr.columns[0].type, DateTime)
+}
+
+
+def _snapshot(user: User) -> dict:
+    return {field: getattr(user, field) for field in USER_FIELDS}
+
+
+def _restore(values: dict) -> User:
+    # detached, not transient: adding it to a session never INSERTs a copy
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def _dumps(values: dict) -> str:
+    return json.dumps(
+        {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in values.items()
+        }
+    )
+
+
+def _loads(payload: bytes) -> dict:
+    values = json.loads(payload)
+    for key in DATETIME_FIELDS:
+        if values.get(key) is not None:
+            values[key] = datetime.fromisoformat(values[key])
+    return values
+
+
+class UserCache:
+    """TTL/LRU cache of users by id for request authentication.
+
+    Every process keeps up to ``maxsize`` users for ``ttl`` seconds; with
+    ``redis_url`` set, misses fall through to a copy shared by all processes.
+    ``invalidate`` drops the local and the shared copy, so other processes
+    see a change after at most ``ttl`` seconds. Callers get a fresh detached
+    ``User`` each time, never a shared instance.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: int,
+        redis_url: str = None,
+        redis_ttl: int = 300,
+        retry_after: float = 30.0,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.retry_after = retry_after
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "errors": 0}
+        self._users = OrderedDict()
+        self._down_until = 0.0
+        self._redis = (
+            aioredis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            if redis_url
+            else None
+        )
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._down_until
+
+    def _failed(self, exc: Exception) -> None:
+        self.stats["errors"] += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning("User cache Redis unavailable, bypassing: %s", exc)
+
+    def _remember(self, user_id: int, values: dict) -> None:
+        self._users[user_id] = (values, time.monotonic() + self.ttl)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.maxsize:
+            self._users.popitem(last=False)
+
+    async def get(self, user_id: int) -> Optional[User]:
+        entry = self._users.get(user_id)
+        if entry and entry[1] > time.monotonic():
+            self._users.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return _restore(entry[0])
+        self._users.pop(user_id, None)
+        if self._redis_available():
+            try:
+                payload = await self._redis.get(USER_KEY.format(user_id=user_id))
+            except (RedisError, OSError) as exc:
+                self._failed(exc)
+                payload = None
+            if payload is not None:
+                values = _loads(payload)
+                self._remember(user_id, values)
+                self.stats["redis_hits"] += 1
+                return _restore(values)
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, user: User) -> None:
+        values = _snapshot(user)
+        self._remember(user.id, values)
+        if self._redis_available():
+            try:
+                await self._redis.set(
+                    USER_KEY.format(user_id=user.id),
+                    _dumps(values),
+                    ex=self.redis_ttl,
+                )
+            except (RedisError, OSError) as exc:
+                self._failed(exc)
+
+    async def invalidate(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+        if self._redis_available():
+            try:
+                await self._redis.delete(USER_KEY.format(user_id=user_id))
+            except (RedisError, OSError) as exc:
+                self._failed(exc)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+user_cache = UserCache(
+    settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL if settings.USER_CACHE_REDIS else None,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL_SECONDS,
+    retry_after=settings.CACHE_RETRY_AFTER_SECONDS,
+)
@@ -1,10 +1,50 @@
-from datetime import date, timedelta
+import asyncio
+from datetime import date, datetime, timedelta
+from collections import namedtuple
+from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, update, delete, cast, Date
-from typing import List, Optional
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy import (
+    any_,
+    bindparam,
+    case,
+    func,
+    update,
+    delete,
+    cast,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    and_,
+    distinct,
+    insert,
+    literal,
+    literal_column,
+    null,
+    or_,
+    tuple_,
+    type_coerce,
+    union_all,
+)
+from typing import AsyncIterator, Iterable, List, Optional
 
-from app.models import User, Transaction, Order
+from app.core.billing import event_key, subscription_changes
+from app.core.cache import analytics_cache
+from app.core.fx import fx_converter, rate_expression
+from app.core.user_cache import user_cache
+from app.db.replica import replica_router
+from app.models import (
+    DailyTotal,
+    JobCheckpoint,
+    Order,
+    PaymentEvent,
+    RecurringPattern,
+    Transaction,
+    User,
+)
+from app.schemas import TransactionCreate
 
 
 # ---------- ORDER ----------
@@ -26,6 +66,15 @@ async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+async def get_user_by_telegram_chat_id(
+    db: AsyncSession, telegram_chat_id: str
+) -> Optional[User]:
+    result = await db.execute(
+        select(User).where(User.telegram_chat_id == telegram_chat_id)
+    )
+    return result.scalar_one_or_none()
+
+
 async def create_user(db: AsyncSession, user: User) -> User:
     db.add(user)
     await db.commit()
@@ -41,15 +90,227 @@ async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
 async def update_user(db: AsyncSession, user_id: int, data: dict) -> Optional[User]:
     await db.execute(update(User).where(User.id == user_id).values(**data))
     await db.commit()
+    await user_cache.invalidate(user_id)
+    await replica_router.pin(user_id)
     return await get_user(db, user_id)
 
 
+async def get_is_subscribed(db: AsyncSession, user_id: int) -> Optional[bool]:
+    """Subscription flag as stored now; payments and expiry change it from
+    Celery, which cached users don't see until their TTL runs out."""
+    result = await db.execute(select(User.is_subscribed).where(User.id == user_id))
+    return result.scalar()
+
+
+async def expire_subscriptions(
+    db: AsyncSession, ended_before: datetime, limit: int
+) -> list:
+    """Unsubscribe up to `limit` users whose subscription ended before
+    `ended_before`, in one UPDATE; commits.
+
+    Returns (id, telegram_chat_id, language) rows of the users expired.
+    """
+    lapsed = and_(User.is_subscribed.is_(True), User.subscription_end < ended_before)
+    ids = select(User.id).where(lapsed).limit(limit).with_for_update(skip_locked=True)
+    # = ANY(ARRAY(...)): the ids are collected once and the rows fetched by
+    # primary key; IN (...) plans as a hash join over the whole users table
+    result = await db.execute(
+        update(User)
+        .where(User.id == any_(func.array(ids.scalar_subquery())), lapsed)
+        .values(is_subscribed=False)
+        .returning(User.id, User.telegram_chat_id, User.language)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    await db.commit()
+    return rows
+
+
+async def revoke_user_tokens(db: AsyncSession, user_id: int) -> None:
+    """Invalidate every access/refresh token issued to the user so far."""
+    await update_user(db, user_id, {"token_version": User.token_version + 1})
+
+
 # --------- TRANSACTION ----------
-async def create_transaction(db: AsyncSession, transaction: Transaction) -> Transaction:
-    db.add(transaction)
+def _transaction_values(transaction: Transaction) -> dict:
+    # unset columns are left out so their defaults (created_at, ...) apply
+    return {
+        column.key: getattr(transaction, column.key)
+        for column in Transaction.__table__.columns
+        if getattr(transaction, column.key) is not None
+    }
+
+
+def _naive_local(value: datetime) -> datetime:
+    # tx_date is a naive timestamp column holding local time; asyncpg
+    # rejects aware datetimes for it
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+async def _after_write(user_id: int) -> None:
+    # drop cached analytics and keep the user's reads on the primary until
+    # replicas have caught up
+    await analytics_cache.bump(user_id)
+    await replica_router.pin(user_id)
+
+
+async def get_base_currency(db: AsyncSession, user_id: int) -> str:
+    """The user's currency as stored now; the cached user may predate a change."""
+    result = await db.execute(select(User.currency).where(User.id == user_id))
+    return result.scalar()
+
+
+async def create_transaction(
+    db: AsyncSession, transaction: Transaction, base_currency: str = None
+) -> Transaction:
+    """Insert a transaction, storing its amount in the user's base currency too.
+
+    Pass ``base_currency`` (the owner's User.currency) when the caller has
+    just read it from the database, to save a lookup; a cached user is not
+    good enough, its currency may have changed since.
+    """
+    base_currency = base_currency or await get_base_currency(db, transaction.user_id)
+    transaction.currency = transaction.currency or "USD"
+    transaction.tx_date = _naive_local(transaction.tx_date or datetime.now())
+    transaction.base_amount = await fx_converter.convert(
+        db,
+        transaction.amount,
+        transaction.currency,
+        base_currency,
+        transaction.tx_date.date(),
+    )
+    # INSERT ... RETURNING gives back the full row, no refresh SELECT needed
+    created = await db.scalar(
+        insert(Transaction)
+        .values(**_transaction_values(transaction))
+        .returning(Transaction)
+    )
+    await apply_daily_totals(db, [created])
+    await db.commit()
+    await _after_write(created.user_id)
+    return created
+
+
+async def _base_amounts(
+    db: AsyncSession, transactions: List[TransactionCreate], base_currency: str
+) -> List[Optional[Decimal]]:
+    days = [tx.tx_date.date() for tx in transactions]
+    await fx_converter.warm(
+        db,
+        {tx.currency for tx in transactions} | {base_currency},
+        min(days),
+        max(days),
+    )
+    return [
+        await fx_converter.convert(db, tx.amount, tx.currency, base_currency, day)
+        for tx, day in zip(transactions, days)
+    ]
+
+
+async def create_transactions(
+    db: AsyncSession,
+    user_id: int,
+    transactions: List[TransactionCreate],
+    base_currency: str = None,
+) -> List[Transaction]:
+    """Insert many transactions with one multi-row INSERT ... RETURNING."""
+    if not transactions:
+        return []
+    for tx in transactions:
+        tx.tx_date = _naive_local(tx.tx_date)
+    base_currency = base_currency or await get_base_currency(db, user_id)
+    base_amounts = await _base_amounts(db, transactions, base_currency)
+    result = await db.scalars(
+        insert(Transaction).returning(Transaction, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "base_amount": base_amount, **tx.model_dump()}
+            for tx, base_amount in zip(transactions, base_amounts)
+        ],
+    )
+    created = result.all()
+    await apply_daily_totals(db, created)
+    await db.commit()
+    await _after_write(user_id)
+    return created
+
+
+COPY_COLUMNS = (
+    "user_id",
+    "type",
+    "amount",
+    "base_amount",
+    "currency",
+    "category",
+    "tx_date",
+    "created_at",
+)
+RollupRow = namedtuple(
+    "RollupRow",
+    ["user_id", "tx_date", "type", "category", "currency", "amount", "base_amount"],
+)
+
+
+def _copy_rows(
+    user_id: int,
+    transactions: List[TransactionCreate],
+    base_amounts: List[Optional[Decimal]],
+    created_at: datetime,
+) -> tuple:
+    """COPY records for `transactions` and their rollup deltas."""
+    records, rollup = [], []
+    for tx, base_amount in zip(transactions, base_amounts):
+        tx_date = _naive_local(tx.tx_date)
+        amount = Decimal(str(tx.amount))
+        records.append(
+            (
+                user_id,
+                tx.type,
+                amount,
+                base_amount,
+                tx.currency,
+                tx.category,
+                tx_date,
+                created_at,
+            )
+        )
+        rollup.append(
+            RollupRow(
+                user_id, tx_date, tx.type, tx.category, tx.currency, amount, base_amount
+            )
+        )
+    return records, rollup_deltas(rollup)
+
+
+async def copy_transactions(
+    db: AsyncSession,
+    user_id: int,
+    transactions: List[TransactionCreate],
+    base_currency: str = None,
+) -> int:
+    """Bulk-load validated transactions with Postgres COPY in one transaction.
+
+    Goes through the raw asyncpg connection, bypassing the ORM entirely; the
+    daily rollup is updated in the same transaction.
+    """
+    if not transactions:
+        return 0
+    base_currency = base_currency or await get_base_currency(db, user_id)
+    base_amounts = await _base_amounts(db, transactions, base_currency)
+    # per-row work of a large batch runs in a thread, off the event loop
+    records, deltas = await asyncio.to_thread(
+        _copy_rows, user_id, transactions, base_amounts, datetime.now()
+    )
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Transaction.__tablename__, records=records, columns=COPY_COLUMNS
+    )
+    await _apply_rollup_deltas(db, deltas)
     await db.commit()
-    await db.refresh(transaction)
-    return transaction
+    await _after_write(user_id)
+    return len(records)
 
 
 async def get_transaction(
@@ -64,12 +325,14 @@ async def get_transaction(
 
 
 async def delete_transaction(db: AsyncSession, tx_id: int, user_id: int) -> None:
-    await db.execute(
-        delete(Transaction).where(
-            Transaction.id == tx_id, Transaction.user_id == user_id
-        )
+    result = await db.execute(
+        delete(Transaction)
+        .where(Transaction.id == tx_id, Transaction.user_id == user_id)
+        .returning(*ROLLUP_COLUMNS)
     )
+    await apply_daily_totals(db, result.all(), sign=-1)
     await db.commit()
+    await _after_write(user_id)
 
 
 async def get_transactions(
@@ -80,18 +343,192 @@ async def get_transactions(
     start_date: date = None,
     end_date: date = None,
     order: str = "desc",
+    after: tuple = None,
 ) -> List[Transaction]:
-    query = select(Transaction).where(Transaction.user_id == user_id)
+    """Page through a user's transactions.
+
+    ``after`` is a (tx_date, id) keyset position: when given, the page starts
+    right after that row and ``skip`` is ignored, so deep pages are an index
+    seek on (user_id, tx_date, id) instead of an OFFSET scan.
+    """
+    query = _transactions_page(
+        select(Transaction), user_id, skip, limit, start_date, end_date, order, after
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+# TransactionOut fields, in order, plus the id the keyset cursor needs
+TRANSACTION_OUT_COLUMNS = (
+    Transaction.type,
+    cast(Transaction.amount, Float).label("amount"),
+    Transaction.currency,
+    Transaction.category,
+    Transaction.tx_date,
+    Transaction.user_id,
+    Transaction.created_at,
+    Transaction.id,
+)
+
+
+async def get_transaction_rows(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: date = None,
+    end_date: date = None,
+    order: str = "desc",
+    after: tuple = None,
+) -> list:
+    """Same page as `get_transactions`, as plain TRANSACTION_OUT_COLUMNS rows.
+
+    Runs on the session's connection, so no ORM instances, identity map or
+    attribute instrumentation are involved; meant for read-only listings.
+    """
+    query = _transactions_page(
+        select(*TRANSACTION_OUT_COLUMNS),
+        user_id,
+        skip,
+        limit,
+        start_date,
+        end_date,
+        order,
+        after,
+    )
+    result = await (await db.connection()).execute(query)
+    return result.all()
+
+
+def _transactions_page(
+    query,
+    user_id,
+    skip,
+    limit,
+    start_date,
+    end_date,
+    order,
+    after,
+):
+    query = query.where(Transaction.user_id == user_id)
     if start_date:
         query = query.where(Transaction.tx_date >= start_date)
     if end_date:
         query = query.where(Transaction.tx_date <= end_date)
-    query = query.order_by(
-        Transaction.tx_date.desc() if order == "desc" else Transaction.tx_date.asc()
+    position = tuple_(Transaction.tx_date, Transaction.id)
+    if order == "desc":
+        query = query.order_by(Transaction.tx_date.desc(), Transaction.id.desc())
+    else:
+        query = query.order_by(Transaction.tx_date.asc(), Transaction.id.asc())
+    if after is not None:
+        query = query.where(
+            position < tuple_(*after) if order == "desc" else position > tuple_(*after)
+        )
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.tx_date,
+    Transaction.type,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.category,
+    Transaction.created_at,
+)
+
+
+def _columns_query(start_date: date, *conditions, columns=()):
+    """One row of arrays over the matching transactions (see get_transaction_columns)."""
+    category = func.coalesce(Transaction.category, "")
+    scoped = (
+        select(
+            *columns,
+            Transaction.id.label("ids"),
+            type_coerce(
+                cast(Transaction.tx_date, Date) - cast(literal(start_date), Date),
+                Integer,
+            ).label("days"),
+            cast(Transaction.base_amount, Float).label("amounts"),
+            (Transaction.type == "expense").label("is_expense"),
+            (func.dense_rank().over(order_by=category) - 1).label("category_codes"),
+            category.label("category"),
+        )
+        .where(
+            Transaction.tx_date >= start_date,
+            Transaction.base_amount.is_not(None),
+            *conditions,
+        )
+        .subquery("scoped")
     )
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return select(
+        *(
+            func.array_agg(column).label(column.key)
+            for column in scoped.c
+            if column.key != "category"
+        ),
+        func.array_agg(
+            aggregate_order_by(distinct(scoped.c.category), scoped.c.category)
+        ).label("categories"),
+    )
+
+
+async def get_transaction_columns(
+    db: AsyncSession, user_id: int, start_date: date, end_date: date
+):
+    """A user's transactions over [start_date, end_date] as parallel arrays.
+
+    Returns a single row of Postgres arrays (id, day offset from start_date,
+    base amount, is_expense, category code) plus the sorted category names
+    the codes index into. Arrays are decoded by the driver in one go instead
+    of building a Python row per transaction. Rows without a base amount (no
+    FX rate yet) are left out.
+    """
+    query = _columns_query(
+        start_date,
+        Transaction.user_id == user_id,
+        Transaction.tx_date < end_date + timedelta(days=1),
+    )
+    result = await (await db.connection()).execute(query)
+    return result.one()
+
+
+async def get_expense_columns(db: AsyncSession, user_ids: List[int], start_date: date):
+    """Expenses of several users since start_date, as get_transaction_columns
+    arrays plus a `user_ids` array; category codes are shared by all users."""
+    query = _columns_query(
+        start_date,
+        Transaction.user_id.in_(user_ids),
+        Transaction.type == "expense",
+        columns=(Transaction.user_id.label("user_ids"),),
+    )
+    result = await (await db.connection()).execute(query)
+    return result.one()
+
+
+async def stream_transactions(
+    db: AsyncSession,
+    user_id: int,
+    start_date: date = None,
+    end_date: date = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[list]:
+    """Yield a user's transactions as chunks of plain row tuples.
+
+    Uses a server-side cursor, so memory is bounded by ``chunk_size`` rather
+    than by the size of the history, and no ORM instances are built.
+    """
+    query = select(*EXPORT_COLUMNS).where(Transaction.user_id == user_id)
+    if start_date:
+        query = query.where(Transaction.tx_date >= start_date)
+    if end_date:
+        query = query.where(Transaction.tx_date <= end_date)
+    query = query.order_by(Transaction.tx_date.asc(), Transaction.id.asc())
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    async for partition in result.partitions():
+        yield [tuple(row) for row in partition]
 
 
 async def get_transactions_by_type(
@@ -124,11 +561,126 @@ async def get_transactions_by_type_grouped(
     end_date: date = None,
 ) -> List[Transaction]:
     query = select(
-        cast(Transaction.tx_date, Date).label("tx_date"),
-        func.sum(Transaction.amount).label("amount"),
-    ).where(Transaction.user_id == user_id, Transaction.type == tx_type)
-    query = query.group_by(cast(Transaction.tx_date, Date))
-    query = query.order_by(cast(Transaction.tx_date, Date).asc())
+        DailyTotal.day.label("tx_date"),
+        func.sum(DailyTotal.base_amount).label("amount"),
+    ).where(DailyTotal.user_id == user_id, DailyTotal.type == tx_type)
+    if start_date:
+        query = query.where(DailyTotal.day >= _as_day(start_date))
+    if end_date:
+        query = query.where(DailyTotal.day <= _as_day(end_date))
+    query = query.group_by(DailyTotal.day)
+    query = query.order_by(DailyTotal.day.asc())
+    result = await db.execute(query)
+    return result.all()
+
+
+TIMESERIES_BUCKETS = ("day", "week", "month", "year")
+
+
+async def get_transactions_timeseries(
+    db: AsyncSession,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    bucket: str = "day",
+) -> list:
+    """Income and expense per bucket over [start_date, end_date].
+
+    Aggregates the daily rollup with date_trunc and left-joins it onto a
+    generate_series of buckets, so empty buckets come back as zeros and the
+    result size depends only on the window.
+    """
+    if bucket not in TIMESERIES_BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    start_date, end_date = _as_day(start_date), _as_day(end_date)
+    # the unit is inlined (it is whitelisted above) so the grouped and the
+    # selected date_trunc() are the same expression for Postgres
+    unit = literal_column(f"'{bucket}'")
+    bucket_start = cast(
+        func.date_trunc(unit, cast(DailyTotal.day, DateTime)), Date
+    ).label("bucket")
+    totals = (
+        select(
+            bucket_start,
+            func.sum(DailyTotal.base_amount)
+            .filter(DailyTotal.type == "income")
+            .label("income"),
+            func.sum(DailyTotal.base_amount)
+            .filter(DailyTotal.type == "expense")
+            .label("expense"),
+        )
+        .where(
+            DailyTotal.user_id == user_id,
+            DailyTotal.day >= start_date,
+            DailyTotal.day <= end_date,
+        )
+        .group_by(bucket_start)
+        .subquery("totals")
+    )
+    series = func.generate_series(
+        func.date_trunc(unit, cast(literal(start_date), DateTime)),
+        func.date_trunc(unit, cast(literal(end_date), DateTime)),
+        literal_column(f"interval '1 {bucket}'"),
+    ).column_valued("bucket")
+    buckets = select(cast(series, Date).label("bucket")).subquery("buckets")
+    query = (
+        select(
+            buckets.c.bucket,
+            func.coalesce(totals.c.income, 0).label("income"),
+            func.coalesce(totals.c.expense, 0).label("expense"),
+        )
+        .select_from(buckets.outerjoin(totals, totals.c.bucket == buckets.c.bucket))
+        .order_by(buckets.c.bucket)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_category_breakdown(
+    db: AsyncSession,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    tx_type: str = None,
+) -> list:
+    """Per-category and per-type sums for a window and the window before it.
+
+    A single GROUPING SETS query over the daily rollup returns rows keyed by
+    (period, type, category) plus the (period, type) subtotals, marked by
+    ``is_total``; the previous period has the same length as the current one.
+    """
+    start_date, end_date = _as_day(start_date), _as_day(end_date)
+    previous_start = start_date - (end_date - start_date) - timedelta(days=1)
+    period = case(
+        (DailyTotal.day >= start_date, literal("current")), else_=literal("previous")
+    ).label("period")
+    scoped = select(
+        period,
+        DailyTotal.type,
+        DailyTotal.category,
+        DailyTotal.base_amount.label("amount"),
+        DailyTotal.count,
+    ).where(
+        DailyTotal.user_id == user_id,
+        DailyTotal.day >= previous_start,
+        DailyTotal.day <= end_date,
+    )
+    if tx_type:
+        scoped = scoped.where(DailyTotal.type == tx_type)
+    scoped = scoped.subquery("scoped")
+    query = select(
+        scoped.c.period,
+        scoped.c.type,
+        scoped.c.category,
+        func.sum(scoped.c.amount).label("amount"),
+        func.sum(scoped.c.count).label("count"),
+        func.grouping(scoped.c.category).label("is_total"),
+    ).group_by(
+        func.grouping_sets(
+            tuple_(scoped.c.period, scoped.c.type, scoped.c.category),
+            tuple_(scoped.c.period, scoped.c.type),
+        )
+    )
     result = await db.execute(query)
     return result.all()
 
@@ -140,12 +692,532 @@ async def get_transactions_amount(
     start_date: date = None,
     end_date: date = None,
 ) -> float:
-    query = select(func.sum(Transaction.amount)).where(
-        Transaction.user_id == user_id, Transaction.type == tx_type
+    # served from the daily rollup, so bounds are applied with day precision
+    query = select(func.sum(DailyTotal.base_amount)).where(
+        DailyTotal.user_id == user_id, DailyTotal.type == tx_type
     )
     if start_date:
-        query = query.where(Transaction.tx_date >= start_date)
+        query = query.where(DailyTotal.day >= _as_day(start_date))
     if end_date:
-        query = query.where(Transaction.tx_date <= end_date)
+        query = query.where(DailyTotal.day <= _as_day(end_date))
     result = await db.execute(query)
     return result.scalar() or 0.0
+
+
+async def get_dashboard_analytics(
+    db: AsyncSession,
+    user_id: int,
+    month_start: datetime,
+    today_start: datetime,
+    end_date: datetime,
+    last_limit: int = 5,
+) -> dict:
+    """All dashboard aggregates in one round trip.
+
+    Replaces the eight sequential queries of the dashboard with a single
+    statement: the last N rows per type are ranked with a window function,
+    daily sums come from the `daily_totals` rollup and the today/month totals
+    are computed with conditional aggregates (FILTER). The branches are glued
+    together with UNION ALL and told apart by the ``kind`` column.
+    """
+    ranked = (
+        select(
+            Transaction.id,
+            Transaction.type,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.category,
+            Transaction.tx_date,
+            func.row_number()
+            .over(partition_by=Transaction.type, order_by=Transaction.tx_date.desc())
+            .label("rn"),
+        )
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.tx_date >= month_start,
+            Transaction.tx_date <= end_date,
+        )
+        .cte("ranked")
+    )
+    daily = (
+        select(
+            DailyTotal.type,
+            DailyTotal.day,
+            func.sum(DailyTotal.base_amount).label("amount"),
+        )
+        .where(DailyTotal.user_id == user_id)
+        .group_by(DailyTotal.type, DailyTotal.day)
+        .cte("daily")
+    )
+    totals = (
+        select(
+            DailyTotal.type,
+            func.sum(DailyTotal.base_amount)
+            .filter(DailyTotal.day >= _as_day(today_start))
+            .label("today_amount"),
+            func.sum(DailyTotal.base_amount).label("month_amount"),
+        )
+        .where(
+            DailyTotal.user_id == user_id,
+            DailyTotal.day >= _as_day(month_start),
+            DailyTotal.day <= _as_day(end_date),
+        )
+        .group_by(DailyTotal.type)
+        .cte("totals")
+    )
+
+    query = union_all(
+        select(
+            literal("last").label("kind"),
+            ranked.c.type,
+            ranked.c.id,
+            ranked.c.tx_date,
+            ranked.c.amount,
+            ranked.c.currency,
+            ranked.c.category,
+        ).where(ranked.c.rn <= last_limit),
+        select(
+            literal("daily"),
+            daily.c.type,
+            null(),
+            cast(daily.c.day, DateTime),
+            daily.c.amount,
+            null(),
+            null(),
+        ),
+        select(
+            literal("today"),
+            totals.c.type,
+            null(),
+            null(),
+            totals.c.today_amount,
+            null(),
+            null(),
+        ),
+        select(
+            literal("month"),
+            totals.c.type,
+            null(),
+            null(),
+            totals.c.month_amount,
+            null(),
+            null(),
+        ),
+    )
+    result = await db.execute(query)
+
+    analytics = {
+        "last_income_transactions": [],
+        "last_expense_transactions": [],
+        "all_income_transactions": [],
+        "all_expense_transactions": [],
+        "income_today_amount": 0.0,
+        "expense_today_amount": 0.0,
+        "income_month_amount": 0.0,
+        "expense_month_amount": 0.0,
+    }
+    for kind, tx_type, tx_id, tx_date, amount, currency, category in result.all():
+        if kind == "last":
+            analytics[f"last_{tx_type}_transactions"].append(
+                {
+                    "id": tx_id,
+                    "type": tx_type,
+                    "tx_date": tx_date,
+                    "amount": amount,
+                    "currency": currency,
+                    "category": category,
+                }
+            )
+        elif kind == "daily":
+            analytics[f"all_{tx_type}_transactions"].append(
+                {"tx_date": tx_date.date(), "amount": amount}
+            )
+        else:
+            analytics[f"{tx_type}_{kind}_amount"] = float(amount or 0)
+
+    for key in ("last_income_transactions", "last_expense_transactions"):
+        analytics[key].sort(key=lambda tx: tx["tx_date"], reverse=True)
+    for key in ("all_income_transactions", "all_expense_transactions"):
+        analytics[key].sort(key=lambda tx: tx["tx_date"])
+    return analytics
+
+
+# ---------- DAILY TOTALS ----------
+# Columns of `transactions` that identify and feed a `daily_totals` row.
+ROLLUP_COLUMNS = (
+    Transaction.user_id,
+    Transaction.tx_date,
+    Transaction.type,
+    Transaction.category,
+    Transaction.currency,
+    Transaction.amount,
+    Transaction.base_amount,
+)
+ROLLUP_KEY = ("user_id", "day", "type", "category", "currency")
+
+
+def _as_day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def rollup_deltas(transactions: Iterable) -> dict:
+    """Sum transactions per rollup key: {key: (amount, base_amount, count)}."""
+    deltas = {}
+    for tx in transactions:
+        key = (
+            tx.user_id,
+            _as_day(tx.tx_date),
+            tx.type,
+            tx.category or "",
+            tx.currency,
+        )
+        amount, base_amount, count = deltas.get(key, (Decimal(0), Decimal(0), 0))
+        deltas[key] = (
+            amount + Decimal(str(tx.amount)),
+            base_amount + Decimal(str(tx.base_amount or 0)),
+            count + 1,
+        )
+    return deltas
+
+
+async def apply_daily_totals(
+    db: AsyncSession, transactions: Iterable, sign: int = 1
+) -> None:
+    """Add (sign=1) or subtract (sign=-1) transactions from the rollup.
+
+    Runs inside the caller's transaction, so the rollup is committed or
+    rolled back together with the rows it describes.
+    """
+    await _apply_rollup_deltas(db, rollup_deltas(transactions), sign)
+
+
+async def _apply_rollup_deltas(db: AsyncSession, deltas: dict, sign: int = 1) -> None:
+    if not deltas:
+        return
+
+    # one cached statement, executed for the whole parameter list
+    stmt = pg_insert(DailyTotal)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "amount": DailyTotal.amount + stmt.excluded.amount,
+            "base_amount": DailyTotal.base_amount + stmt.excluded.base_amount,
+            "count": DailyTotal.count + stmt.excluded.count,
+        },
+    )
+    await db.execute(
+        stmt,
+        [
+            {
+                **dict(zip(ROLLUP_KEY, key)),
+                "amount": sign * amount,
+                "base_amount": sign * base_amount,
+                "count": sign * count,
+            }
+            for key, (amount, base_amount, count) in deltas.items()
+        ],
+    )
+    if sign < 0:
+        await db.execute(
+            delete(DailyTotal).where(
+                DailyTotal.user_id.in_({key[0] for key in deltas}),
+                DailyTotal.count <= 0,
+            )
+        )
+
+
+def _daily_totals_source(user_id: int = None):
+    day = cast(Transaction.tx_date, Date)
+    category = func.coalesce(Transaction.category, "")
+    query = select(
+        Transaction.user_id,
+        day.label("day"),
+        Transaction.type,
+        category.label("category"),
+        Transaction.currency,
+        func.sum(Transaction.amount).label("amount"),
+        func.coalesce(func.sum(Transaction.base_amount), 0).label("base_amount"),
+        func.count().label("count"),
+    ).group_by(
+        Transaction.user_id, day, Transaction.type, category, Transaction.currency
+    )
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    return query
+
+
+async def rebuild_daily_totals(db: AsyncSession, user_id: int = None) -> None:
+    """Recompute the rollup from `transactions` (for one user or everyone)."""
+    query = delete(DailyTotal)
+    if user_id is not None:
+        query = query.where(DailyTotal.user_id == user_id)
+    await db.execute(query)
+    source = _daily_totals_source(user_id)
+    await db.execute(
+        insert(DailyTotal).from_select(
+            [*ROLLUP_KEY, "amount", "base_amount", "count"], source
+        )
+    )
+    await db.commit()
+
+
+async def check_daily_totals(db: AsyncSession, user_id: int = None) -> list:
+    """Return rollup keys whose sum or count disagrees with `transactions`."""
+    source = _daily_totals_source(user_id).subquery("source")
+    rollup = select(DailyTotal)
+    if user_id is not None:
+        rollup = rollup.where(DailyTotal.user_id == user_id)
+    rollup = rollup.subquery("rollup")
+    on = [source.c[key] == rollup.c[key] for key in ROLLUP_KEY]
+    query = (
+        select(
+            *[
+                func.coalesce(source.c[key], rollup.c[key]).label(key)
+                for key in ROLLUP_KEY
+            ],
+            source.c.amount.label("expected_amount"),
+            rollup.c.amount.label("actual_amount"),
+            source.c.base_amount.label("expected_base_amount"),
+            rollup.c.base_amount.label("actual_base_amount"),
+            source.c.count.label("expected_count"),
+            rollup.c.count.label("actual_count"),
+        )
+        .select_from(source.join(rollup, and_(*on), full=True))
+        .where(
+            or_(
+                source.c.amount.is_distinct_from(rollup.c.amount),
+                source.c.base_amount.is_distinct_from(rollup.c.base_amount),
+                source.c.count.is_distinct_from(rollup.c.count),
+            )
+        )
+    )
+    result = await db.execute(query)
+    return result.all()
+
+
+# ---------- FX ----------
+async def renormalize_base_amounts(db: AsyncSession, user_id: int = None) -> int:
+    """Recompute `base_amount` in the owner's current currency, set-based.
+
+    Rates are resolved in SQL as of each transaction's day, so this is a
+    single UPDATE however many rows it touches; the rollup is rebuilt after.
+    """
+    # UPDATE transactions ... FROM users
+    query = (
+        update(Transaction)
+        .where(Transaction.user_id == User.id)
+        .values(base_amount=_base_amount_expression())
+    )
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    result = await db.execute(query.execution_options(synchronize_session=False))
+    await rebuild_daily_totals(db, user_id)
+    return result.rowcount
+
+
+def _base_amount_expression():
+    day = cast(Transaction.tx_date, Date)
+    factor = rate_expression(Transaction.currency, day) / rate_expression(
+        User.currency, day
+    )
+    return case(
+        (Transaction.currency == User.currency, Transaction.amount),
+        else_=func.round(Transaction.amount * factor, 2),
+    )
+
+
+async def fill_missing_base_amounts(db: AsyncSession, since: date) -> List[int]:
+    """Convert transactions from `since` on that were stored before their
+    rate was known, and add them to the rollup's base totals.
+
+    Rows whose rate is still missing stay NULL. Returns the ids of the users
+    whose totals changed.
+    """
+    base_amount = _base_amount_expression()
+    result = await db.execute(
+        update(Transaction)
+        .where(
+            Transaction.user_id == User.id,
+            Transaction.base_amount.is_(None),
+            Transaction.tx_date >= since,
+            base_amount.is_not(None),
+        )
+        .values(base_amount=base_amount)
+        .returning(
+            Transaction.user_id,
+            Transaction.tx_date,
+            Transaction.type,
+            Transaction.category,
+            Transaction.currency,
+            Transaction.base_amount,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    deltas = {}
+    for tx in result.all():
+        key = (tx.user_id, _as_day(tx.tx_date), tx.type, tx.category or "", tx.currency)
+        deltas[key] = deltas.get(key, Decimal(0)) + tx.base_amount
+    if deltas:
+        # the rows are already counted in the rollup, with a base amount of 0
+        rollup = DailyTotal.__table__
+        await db.execute(
+            update(rollup)
+            .where(*(rollup.c[key] == bindparam(f"k_{key}") for key in ROLLUP_KEY))
+            .values(base_amount=rollup.c.base_amount + bindparam("delta")),
+            [
+                {**{f"k_{k}": v for k, v in zip(ROLLUP_KEY, key)}, "delta": delta}
+                for key, delta in deltas.items()
+            ],
+        )
+    await db.commit()
+    return sorted({user_id for user_id, *_ in deltas})
+
+
+# ---------- RECURRING ----------
+async def get_recurring_patterns(
+    db: AsyncSession, user_id: int
+) -> List[RecurringPattern]:
+    result = await db.execute(
+        select(RecurringPattern)
+        .where(RecurringPattern.user_id == user_id)
+        .order_by(RecurringPattern.next_date)
+    )
+    return result.scalars().all()
+
+
+async def replace_recurring_patterns(
+    db: AsyncSession, user_ids: List[int], patterns: List[dict]
+) -> None:
+    """Swap the stored patterns of `user_ids` for `patterns`; no commit."""
+    await db.execute(
+        delete(RecurringPattern).where(RecurringPattern.user_id.in_(user_ids))
+    )
+    if patterns:
+        await db.execute(insert(RecurringPattern), patterns)
+
+
+async def get_user_ids_page(
+    db: AsyncSession, after: int, limit: int, shard: int = 0, shards: int = 1
+) -> List[int]:
+    """Next `limit` user ids above `after` that belong to `shard`."""
+    result = await db.execute(
+        select(User.id)
+        .where(User.id > after, User.id % shards == shard)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def lock_checkpoint(db: AsyncSession, name: str) -> Optional[int]:
+    """Lock the job's checkpoint row for this transaction and return its position.
+
+    Returns None when another worker holds it, so the same job never runs
+    twice at once.
+    """
+    await db.execute(
+        pg_insert(JobCheckpoint)
+        .values(name=name, position=0, updated_at=datetime.now())
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    result = await db.execute(
+        select(JobCheckpoint.position)
+        .where(JobCheckpoint.name == name)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalar()
+
+
+async def save_checkpoint(db: AsyncSession, name: str, position: int) -> None:
+    await db.execute(
+        update(JobCheckpoint)
+        .where(JobCheckpoint.name == name)
+        .values(position=position, updated_at=datetime.now())
+    )
+
+
+# ---------- PAYMENT EVENTS ----------
+async def record_payment_event(db: AsyncSession, data: dict) -> Optional[int]:
+    """Store a verified LiqPay callback; None if it was delivered before."""
+    result = await db.execute(
+        pg_insert(PaymentEvent)
+        .values(
+            event_key=event_key(data),
+            order_id=data.get("order_id"),
+            action=data.get("action"),
+            status=data.get("status"),
+            payload=data,
+        )
+        .on_conflict_do_nothing(index_elements=["event_key"])
+        .returning(PaymentEvent.id)
+    )
+    await db.commit()
+    return result.scalar()
+
+
+async def _has_later_payment_event(db: AsyncSession, event: PaymentEvent) -> bool:
+    # an old callback whose task was lost must not undo a newer one already
+    # applied to the same order, e.g. a success arriving after an unsubscribe
+    result = await db.execute(
+        select(PaymentEvent.id)
+        .where(
+            PaymentEvent.order_id == event.order_id,
+            PaymentEvent.received_at > event.received_at,
+            PaymentEvent.processed_at.is_not(None),
+            PaymentEvent.error.is_(None),
+        )
+        .limit(1)
+    )
+    return result.scalar() is not None
+
+
+async def apply_payment_event(db: AsyncSession, event_id: int) -> Optional[int]:
+    """Apply a stored callback to its user once and mark it processed.
+
+    Returns the id of the user whose subscription changed. Events already
+    processed, or being processed by another worker, are skipped; malformed
+    ones and ones older than an applied event of the same order are marked
+    processed with an error.
+    """
+    result = await db.execute(
+        select(PaymentEvent)
+        .where(PaymentEvent.id == event_id, PaymentEvent.processed_at.is_(None))
+        .with_for_update(skip_locked=True)
+    )
+    event = result.scalar_one_or_none()
+    if event is None:
+        return None
+    user_id = None
+    try:
+        changes = subscription_changes(event.payload)
+    except (TypeError, ValueError, OverflowError, OSError) as exc:
+        # a malformed callback never gets better: record it instead of retrying
+        changes = None
+        event.error = f"Invalid callback: {exc}"
+    if changes:
+        order = await get_order(db, event.order_id)
+        if order is None:
+            event.error = "Order not found"
+        elif await _has_later_payment_event(db, event):
+            event.error = "Superseded by a later event"
+        else:
+            user_id = order.user_id
+            await db.execute(update(User).where(User.id == user_id).values(**changes))
+    event.processed_at = func.now()
+    await db.commit()
+    return user_id
+
+
+async def get_pending_payment_event_ids(
+    db: AsyncSession, received_before: datetime, limit: int
+) -> List[int]:
+    result = await db.execute(
+        select(PaymentEvent.id)
+        .where(
+            PaymentEvent.processed_at.is_(None),
+            PaymentEvent.received_at < received_before,
+        )
+        .order_by(PaymentEvent.received_at)
+        .limit(limit)
+    )
+    return result.scalars().all()
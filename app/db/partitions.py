@@ -0,0 +1,116 @@
+import re
+from datetime import date
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# `transactions` is range-partitioned by tx_date, one partition per month
+# (transactions_pYYYY_MM) plus transactions_default for anything outside
+# the created ranges. New months are created ahead of time by the
+# ensure_transaction_partitions Celery task.
+
+PARENT = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+PARTITION_NAME = re.compile(r"^transactions_p(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{PARENT}_p{start:%Y_%m}"
+
+
+def is_partition(name: str) -> bool:
+    return name == DEFAULT_PARTITION or PARTITION_NAME.match(name) is not None
+
+
+async def list_partitions(db: AsyncSession) -> List[Tuple[str, date]]:
+    """Monthly partitions attached to `transactions`, as (name, month) pairs."""
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT},
+    )
+    partitions = []
+    for (name,) in result:
+        if match := PARTITION_NAME.match(name):
+            partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+async def create_partitions(db: AsyncSession, start: date, end: date) -> List[str]:
+    """Create the missing monthly partitions covering [start, end].
+
+    Each one is built as a plain table, filled with the rows the default
+    partition already holds for its month and then attached, so this also
+    works for past months that received rows before their partition existed.
+    """
+    existing = {name for name, _ in await list_partitions(db)}
+    created = []
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        name, upper = partition_name(month), add_months(month, 1)
+        if name not in existing:
+            bounds = {"lower": month, "upper": upper}
+            await db.execute(
+                text(
+                    f"CREATE TABLE {name} "
+                    f"(LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            await db.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                    "WHERE tx_date >= :lower AND tx_date < :upper RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            await db.execute(
+                text(
+                    f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+                )
+            )
+            created.append(name)
+        month = upper
+    await db.commit()
+    return created
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int) -> List[str]:
+    """Make sure the current month and the next ``months_ahead`` exist."""
+    today = date.today()
+    return await create_partitions(db, today, add_months(today, months_ahead))
+
+
+async def detach_partitions(
+    db: AsyncSession, before: date, drop: bool = False
+) -> List[str]:
+    """Detach (and optionally drop) partitions entirely before ``before``.
+
+    Detaching is a catalog-only change: the month's rows stay in a standalone
+    table that can be archived or dropped without touching the live table.
+    `daily_totals` keeps the month's sums until it is rebuilt.
+    """
+    detached = []
+    for name, month in await list_partitions(db):
+        if add_months(month, 1) > before:
+            continue
+        await db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            await db.execute(text(f"DROP TABLE {name}"))
+        detached.append(name)
+    await db.commit()
+    return detached
@@ -0,0 +1,135 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Tuple
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import async_session, engine, read_engine, read_session
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = "replica:pin:{user_id}"
+
+
+class ReplicaRouter:
+    """Keeps a user's reads on the primary for ``window`` seconds after a write.
+
+    For ``grace`` seconds more, reads go to the replica but their results
+    must not be cached: a replica lagging past the window would otherwise
+    leave a stale entry for the cache's whole TTL. The pin is remembered
+    in-process and in Redis, so reads served by other processes see it as
+    well. If Redis can't be asked, reads go to the primary: a stale answer
+    is worse than a slower one.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        window: float,
+        grace: float,
+        retry_after: float,
+        enabled: bool,
+    ):
+        self.window = window
+        self.grace = grace
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.stats = {
+            "replica": 0,
+            "primary": 0,
+            "pinned": 0,
+            "uncached": 0,
+            "errors": 0,
+        }
+        self._pinned = {}
+        self._down_until = 0.0
+        self._redis = (
+            aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            if enabled
+            else None
+        )
+
+    def _failed(self, exc: Exception) -> None:
+        self.stats["errors"] += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning("Replica routing can't reach Redis, using primary: %s", exc)
+
+    async def pin(self, user_id: int) -> None:
+        """Record a write by the user."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if len(self._pinned) > 10000:
+            self._pinned = {k: v for k, v in self._pinned.items() if v > now}
+        self._pinned[user_id] = now + self.window + self.grace
+        if now < self._down_until:
+            return
+        try:
+            await self._redis.set(
+                PIN_KEY.format(user_id=user_id),
+                1,
+                px=int((self.window + self.grace) * 1000),
+            )
+        except (RedisError, OSError) as exc:
+            self._failed(exc)
+
+    async def _pin_left(self, user_id: int) -> float:
+        # seconds until the user's last write is out of window and grace
+        until = self._pinned.get(user_id)
+        if until is not None:
+            left = until - time.monotonic()
+            if left > 0:
+                return left
+            del self._pinned[user_id]
+        left_ms = await self._redis.pttl(PIN_KEY.format(user_id=user_id))
+        return max(left_ms, 0) / 1000
+
+    async def route(self, user_id: int) -> Tuple[bool, bool]:
+        """(read from the replica, results may be cached)."""
+        if not self.enabled:
+            return False, True
+        if time.monotonic() < self._down_until:
+            self.stats["primary"] += 1
+            return False, True
+        try:
+            left = await self._pin_left(user_id)
+        except (RedisError, OSError) as exc:
+            self._failed(exc)
+            self.stats["primary"] += 1
+            return False, True
+        if left > self.grace:
+            self.stats["pinned"] += 1
+            return False, True
+        if left > 0:
+            self.stats["uncached"] += 1
+            return True, False
+        self.stats["replica"] += 1
+        return True, True
+
+
+replica_router = ReplicaRouter(
+    settings.REDIS_URL,
+    window=settings.REPLICA_STALENESS_SECONDS,
+    grace=settings.REPLICA_CACHE_GRACE_SECONDS,
+    retry_after=settings.CACHE_RETRY_AFTER_SECONDS,
+    enabled=read_engine is not engine,
+)
+
+
+@asynccontextmanager
+async def read_session_for(user_id: int) -> AsyncIterator[AsyncSession]:
+    """Session for read-only work on the user's data: the replica, unless the
+    user wrote within the staleness window (or no replica is configured)."""
+    use_replica, cacheable = await replica_router.route(user_id)
+    async with (read_session if use_replica else async_session)() as session:
+        session.info["cacheable"] = cacheable
+        yield session
+
+
+def may_cache(session: AsyncSession) -> bool:
+    """Whether results read through `session` may go into a shared cache."""
+    return session.info.get("cacheable", True)
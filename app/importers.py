@@ -0,0 +1,198 @@
+import asyncio
+import codecs
+import csv
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import copy_transactions, get_base_currency
+from app.schemas import TransactionCreate
+
+# Bank statement parsers for the bulk import endpoint.
+# Both parsers read the upload incrementally and yield (line/entry number,
+# raw dict) pairs; `validate_batch` turns a batch of those into
+# TransactionCreate objects plus per-row errors and `import_statement` drives
+# the whole parse -> validate -> COPY pipeline chunk by chunk, parsing the
+# next chunk in a worker thread while the current one is COPY'd.
+
+CSV_ALIASES = {
+    "date": "tx_date",
+    "datetime": "tx_date",
+    "transaction_date": "tx_date",
+    "sum": "amount",
+    "value": "amount",
+    "kind": "type",
+}
+
+OFX_BLOCK = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+OFX_FIELD = re.compile(r"<([A-Z0-9.]+)>([^<\r\n]*)", re.I)
+OFX_CURRENCY = re.compile(r"<CURDEF>([A-Z]{3})", re.I)
+
+
+def _normalize(row: dict) -> dict:
+    """Fill `type` from the amount sign when the statement only has signed
+    amounts; with a `type` column the sign is redundant (expense,-12.50)."""
+    amount = row.get("amount")
+    if amount in (None, ""):
+        return row
+    try:
+        value = Decimal(str(amount).replace(",", "."))
+    except InvalidOperation:
+        return row
+    if not row.get("type"):
+        row["type"] = "expense" if value < 0 else "income"
+    row["amount"] = str(abs(value))
+    return row
+
+
+def iter_csv_rows(
+    file: BinaryIO, default_currency: str, encoding: str = "utf-8-sig"
+) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(codecs.iterdecode(file, encoding))
+    if reader.fieldnames:
+        reader.fieldnames = [
+            CSV_ALIASES.get(name.strip().lower(), name.strip().lower())
+            for name in reader.fieldnames
+        ]
+    for row in reader:
+        row = {key: (value or "").strip() for key, value in row.items() if key}
+        row["currency"] = row.get("currency") or default_currency
+        row["category"] = row.get("category") or None
+        yield reader.line_num, _normalize(row)
+
+
+def _ofx_date(value: str) -> str:
+    # DTPOSTED looks like 20250131 or 20250131120000[.XXX][+2:EET]
+    digits = value.strip()[:14]
+    fmt = "%Y%m%d%H%M%S" if len(digits) == 14 else "%Y%m%d"
+    return datetime.strptime(digits, fmt).isoformat()
+
+
+def iter_ofx_rows(
+    file: BinaryIO,
+    default_currency: str,
+    encoding: str = "latin-1",
+    chunk_size: int = 64 * 1024,
+) -> Iterator[Tuple[int, dict]]:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    currency = default_currency
+    entry = 0
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+        if currency == default_currency and (match := OFX_CURRENCY.search(buffer)):
+            currency = match.group(1).upper()
+        end = 0
+        for match in OFX_BLOCK.finditer(buffer):
+            entry += 1
+            end = match.end()
+            fields = {
+                key.upper(): value.strip()
+                for key, value in OFX_FIELD.findall(match.group(1))
+            }
+            try:
+                tx_date = _ofx_date(fields.get("DTPOSTED", ""))
+            except ValueError:
+                tx_date = fields.get("DTPOSTED")
+            yield entry, _normalize(
+                {
+                    "amount": fields.get("TRNAMT"),
+                    "tx_date": tx_date,
+                    "currency": fields.get("CURRENCY") or currency,
+                    # payee names are not categories; left for the user to set
+                    "category": None,
+                }
+            )
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+BATCH_ADAPTER = TypeAdapter(List[TransactionCreate])
+
+
+def validate_batch(
+    rows: List[Tuple[int, dict]],
+) -> Tuple[List[TransactionCreate], List[dict]]:
+    # clean batches are validated in one call; only a batch that contains
+    # errors pays for row-by-row validation to report them
+    try:
+        return BATCH_ADAPTER.validate_python([row for _, row in rows]), []
+    except ValidationError:
+        pass
+    valid, errors = [], []
+    for line, row in rows:
+        try:
+            valid.append(TransactionCreate.model_validate(row))
+        except ValidationError as exc:
+            errors.append(
+                {
+                    "row": line,
+                    "errors": [
+                        f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}"
+                        for err in exc.errors()
+                    ],
+                }
+            )
+    return valid, errors
+
+
+def read_chunk(
+    rows: Iterator[Tuple[int, dict]], size: int
+) -> Tuple[List[TransactionCreate], List[dict], bool]:
+    """Parse and validate the next `size` rows; blocking, run it in a thread.
+
+    The last element is True once the statement is exhausted.
+    """
+    batch = list(islice(rows, size))
+    valid, errors = validate_batch(batch)
+    return valid, errors, len(batch) < size
+
+
+async def import_statement(
+    db: AsyncSession,
+    user_id: int,
+    file: BinaryIO,
+    format: str,
+    default_currency: str = None,
+    base_currency: str = None,
+) -> dict:
+    """Import a statement; each chunk is COPY'd and committed on its own.
+
+    Rows without a currency get ``default_currency``, the user's base
+    currency (read from the database) unless given.
+    """
+    base_currency = base_currency or await get_base_currency(db, user_id)
+    default_currency = default_currency or base_currency
+    parse = iter_ofx_rows if format == "ofx" else iter_csv_rows
+    rows = parse(file, default_currency=default_currency)
+    imported, failed, errors = 0, 0, []
+
+    def next_chunk():
+        # the file read, decoding and validation stay off the event loop
+        return asyncio.ensure_future(
+            asyncio.to_thread(read_chunk, rows, settings.IMPORT_CHUNK_SIZE)
+        )
+
+    pending = next_chunk()
+    try:
+        while pending is not None:
+            valid, batch_errors, last = await pending
+            pending = None if last else next_chunk()
+            imported += await copy_transactions(db, user_id, valid, base_currency)
+            failed += len(batch_errors)
+            errors.extend(
+                batch_errors[: max(settings.IMPORT_MAX_ERRORS - len(errors), 0)]
+            )
+    finally:
+        if pending is not None:
+            # a failed COPY: let the worker finish with the upload first
+            await asyncio.gather(pending, return_exceptions=True)
+    return {"imported": imported, "failed": failed, "errors": errors}
@@ -1,15 +1,31 @@
 import os
 import shutil
+from contextlib import asynccontextmanager
 from uuid import uuid4
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 # Якщо треба підключати роутери — імпортуй тут:
-from app.api.endpoints import auth, transactions
+from app.api.endpoints import auth, internal, transactions
+from app.core.ai import ai_client
+from app.core.billing import liqpay_client
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, register_pool_collector, render_metrics
+from app.db.session import engine, read_engine
 from app.tg_bot.webhook_router import router_webhook
 
-app = FastAPI(title="AI Finance Tracker", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    liqpay_client.start()
+    ai_client.start()
+    yield
+    await liqpay_client.close()
+    await ai_client.close()
+
+
+app = FastAPI(title="AI Finance Tracker", version="0.1.0", lifespan=lifespan)
 
 # CORS — дозволь localhost:3000 (Next.js)
 app.add_middleware(
@@ -18,8 +34,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    register_pool_collector(engines)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(body, media_type=content_type)
+
 
 # Базовий healthcheck
 @app.get("/ping")
@@ -32,4 +61,5 @@ app.include_router(auth.router, prefix="/api/users", tags=["Users"])
 app.include_router(
     transactions.router, prefix="/api/transactions", tags=["Transactions"]
 )
-app.include_router(router_webhook, tags=["Telegram Bot"])
\ No newline at end of file
+app.include_router(router_webhook, tags=["Telegram Bot"])
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
\ No newline at end of file
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 from sqlalchemy import (
     ARRAY,
@@ -13,7 +13,11 @@ from sqlalchemy import (
     Text,
     func,
     Numeric,
+    Date,
+    Index,
+    BigInteger,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -23,17 +27,42 @@ from app.db.base import Base
 class Transaction(Base):
     __tablename__ = "transactions"
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     type: Mapped[str] = mapped_column(default="expense")  # 'income' or 'expense'
     amount: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     currency: Mapped[str] = mapped_column(String(5), default="USD")
+    # amount converted to the owner's User.currency; NULL while no rate is known
+    base_amount: Mapped[Optional[float]] = mapped_column(Numeric(14, 2), nullable=True)
     category: Mapped[str] = mapped_column(String(100), nullable=True)
-    tx_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    # partition key, hence part of the primary key (see app/db/partitions.py)
+    tx_date: Mapped[datetime] = mapped_column(
+        DateTime, primary_key=True, default=datetime.now
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
 
     user: Mapped["User"] = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # keyset pagination: WHERE user_id = ? AND (tx_date, id) < (?, ?)
+        Index("ix_transactions_user_id_tx_date_id", "user_id", "tx_date", "id"),
+        # per-type listings and the dashboard "last N" ranking, index-only
+        Index(
+            "ix_transactions_user_id_type_tx_date",
+            "user_id",
+            "type",
+            "tx_date",
+            postgresql_include=["id", "amount", "currency", "category"],
+        ),
+        # rows written before their FX rate was known, filled in by load_fx_rates
+        Index(
+            "ix_transactions_missing_base_amount",
+            "tx_date",
+            postgresql_where=base_amount.is_(None),
+        ),
+        {"postgresql_partition_by": "RANGE (tx_date)"},
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -65,11 +94,31 @@ class User(Base):
     liqpay_order_id: Mapped[str] = mapped_column(String(100), nullable=True)
     order_id: Mapped[str] = mapped_column(String(100), nullable=True)
     cancel_at_period_end: Mapped[bool] = mapped_column(Boolean, default=False)
+    # part of every access token; bumping it revokes the user's tokens
+    token_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     transactions: Mapped[List[Transaction]] = relationship(
         "Transaction", back_populates="user"
     )
 
+    __table_args__ = (
+        # every Telegram handler looks the user up by chat id; most web users
+        # have none, so only index the rows that do
+        Index(
+            "ix_users_telegram_chat_id",
+            "telegram_chat_id",
+            postgresql_where=telegram_chat_id.isnot(None),
+        ),
+        # the expiry sweep only ever looks at active subscriptions
+        Index(
+            "ix_users_active_subscription_end",
+            "subscription_end",
+            postgresql_where=is_subscribed.is_(True),
+        ),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -78,3 +127,112 @@ class Order(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class DailyTotal(Base):
+    """Per-day rollup of transactions, maintained together with `transactions`."""
+
+    __tablename__ = "daily_totals"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    type: Mapped[str] = mapped_column(String, primary_key=True)
+    # empty string stands for "no category" so it can be part of the key
+    category: Mapped[str] = mapped_column(String(100), primary_key=True, default="")
+    currency: Mapped[str] = mapped_column(String(5), primary_key=True)
+    amount: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    base_amount: Mapped[float] = mapped_column(
+        Numeric(16, 2), nullable=False, default=0
+    )
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # per-type daily series and period sums, index-only
+        Index(
+            "ix_daily_totals_user_id_type_day",
+            "user_id",
+            "type",
+            "day",
+            postgresql_include=["base_amount", "count"],
+        ),
+        # category breakdowns over a date window, index-only
+        Index(
+            "ix_daily_totals_user_id_day",
+            "user_id",
+            "day",
+            postgresql_include=["type", "category", "base_amount", "count"],
+        ),
+    )
+
+
+class FxRate(Base):
+    """Value of one unit of `currency` in settings.FX_QUOTE_CURRENCY on `day`."""
+
+    __tablename__ = "fx_rates"
+
+    currency: Mapped[str] = mapped_column(String(5), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    rate: Mapped[float] = mapped_column(Numeric(18, 8), nullable=False)
+
+
+class RecurringPattern(Base):
+    """A detected recurring expense (subscription, bill) of a user."""
+
+    __tablename__ = "recurring_patterns"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    category: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    # mean amount in the user's base currency
+    amount: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+    interval_days: Mapped[int] = mapped_column(Integer, nullable=False)
+    occurrences: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_date: Mapped[date] = mapped_column(Date, nullable=False)
+    next_date: Mapped[date] = mapped_column(Date, nullable=False)
+    detected_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class JobCheckpoint(Base):
+    """Resume position of a long-running batch job, e.g. the last user id done."""
+
+    __tablename__ = "job_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, onupdate=datetime.now
+    )
+
+
+class PaymentEvent(Base):
+    """A verified LiqPay callback, stored before it is applied by a worker."""
+
+    __tablename__ = "payment_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # LiqPay retries deliveries; the same event always gets the same key
+    event_key: Mapped[str] = mapped_column(String(200), unique=True, nullable=False)
+    order_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    action: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    processed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        # the sweep for events whose task never ran
+        Index(
+            "ix_payment_events_pending",
+            "received_at",
+            postgresql_where=processed_at.is_(None),
+        ),
+        # the latest applied callback of an order, to skip stale ones
+        Index("ix_payment_events_order_received", "order_id", "received_at"),
+    )
@@ -3,8 +3,6 @@ from typing import Literal, Optional, List
 from datetime import datetime, date as date_datetime
 import enum
 
-from app.models import Transaction
-
 
 class LoginInApp(BaseModel):
     email: EmailStr
@@ -75,30 +73,23 @@ class TransactionInDBBase(TransactionBase):
     user_id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TransactionOut(TransactionInDBBase):
     pass
 
 
-class AnalyticsTransactionForAI(BaseModel):
-    id: int
-    tx_date: str
-    amount: float
-    currency: str
-    category: Optional[str] = None
-    type: Literal["income", "expense"]
-
-    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
-
-    # replace datetime to midnight
-    @model_validator(mode="before")
-    def replace_datetime(cls, values: Transaction):
-        if values.tx_date:
-            values.tx_date = values.tx_date.strftime("%Y-%m-%d %H:%M:%S")
-        return values
+def _as_field_dict(model, values) -> dict:
+    # ORM objects and rows are read into a new dict, so "before" validators
+    # can rewrite fields without mutating (and dirtying) the original
+    if isinstance(values, dict):
+        return dict(values)
+    return {
+        name: getattr(values, name)
+        for name in model.model_fields
+        if hasattr(values, name)
+    }
 
 
 class AnalyticsTransaction(BaseModel):
@@ -111,13 +102,12 @@ class AnalyticsTransaction(BaseModel):
 
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
-    # replace datetime to midnight
+    # replace datetime to midnight, without touching the source object
     @model_validator(mode="before")
-    def replace_datetime(cls, values: Transaction):
-        if values.tx_date:
-            values.tx_date = values.tx_date.replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
+    def replace_datetime(cls, values):
+        values = _as_field_dict(cls, values)
+        if isinstance(values.get("tx_date"), datetime):
+            values["tx_date"] = values["tx_date"].date()
         return values
 
 
@@ -140,5 +130,92 @@ class AnalyticsTransactionOut(BaseModel):
     expense_month_amount: float
 
 
+class TimeSeriesPoint(BaseModel):
+    bucket: date_datetime = Field(alias="date")
+    income: float
+    expense: float
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+
+class TimeSeriesOut(BaseModel):
+    bucket: Literal["day", "week", "month", "year"]
+    start: date_datetime
+    end: date_datetime
+    points: List[TimeSeriesPoint]
+
+
+class CategoryBreakdownItem(BaseModel):
+    type: Literal["income", "expense"]
+    category: Optional[str] = None
+    amount: float
+    count: int
+    share: float
+    previous_amount: float
+    delta: float
+    delta_pct: Optional[float] = None
+
+
+class CategoryBreakdownOut(BaseModel):
+    start: date_datetime
+    end: date_datetime
+    income_total: float
+    expense_total: float
+    previous_income_total: float
+    previous_expense_total: float
+    categories: List[CategoryBreakdownItem]
+
+
+class InsightsPoint(BaseModel):
+    day: date_datetime = Field(alias="date")
+    income: float
+    expense: float
+    avg_7d: float
+    avg_30d: float
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class InsightsAnomaly(BaseModel):
+    id: int
+    day: date_datetime = Field(alias="date")
+    category: Optional[str] = None
+    amount: float
+    category_mean: float
+    zscore: float
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class InsightsOut(BaseModel):
+    currency: str
+    start: date_datetime
+    end: date_datetime
+    transactions: int
+    month_income: float
+    month_expense: float
+    burn_rate: float
+    projected_month_expense: float
+    projected_month_balance: float
+    points: List[InsightsPoint]
+    anomalies: List[InsightsAnomaly]
+
+
+class RecurringPatternOut(BaseModel):
+    category: Optional[str] = None
+    amount: float
+    interval_days: int
+    occurrences: int
+    last_date: date_datetime
+    next_date: date_datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class AIGenerateInput(BaseModel):
     question: str
+    # window the answer is based on, the current month by default
+    start: Optional[date_datetime] = None
+    end: Optional[date_datetime] = None
+    # answer as Server-Sent Events, one event per text delta
+    stream: bool = False
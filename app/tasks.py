@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+import redis
+from redis.exceptions import RedisError
+
+from app.analytics import scan_recurring
+from app.core.cache import VERSION_KEY
+from app.core.celery import celery_app
+from app.core.config import settings
+from app.core.fx import get_provider, load_rates
+from app.core.user_cache import USER_KEY
+from app.crud import (
+    apply_payment_event,
+    expire_subscriptions,
+    fill_missing_base_amounts,
+    get_pending_payment_event_ids,
+    renormalize_base_amounts,
+)
+from app.db.partitions import ensure_partitions
+from app.db.replica import PIN_KEY
+from app.db.session import task_session
+from app.tg_bot.locale import _
+from app.tg_bot.notify import send_messages
+
+logger = logging.getLogger(__name__)
+
+
+def _pin(pipe, user_ids: list) -> None:
+    # same key ReplicaRouter.pin sets: primary reads, then uncached replica reads
+    pin_ms = int(
+        (settings.REPLICA_STALENESS_SECONDS + settings.REPLICA_CACHE_GRACE_SECONDS)
+        * 1000
+    )
+    for user_id in user_ids:
+        pipe.set(PIN_KEY.format(user_id=user_id), 1, px=pin_ms)
+
+
+def _invalidate_analytics(user_id: int) -> None:
+    # what crud._after_write does: the version counter AnalyticsCache.bump
+    # increments and the replica pin, from sync code
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+        pipe = client.pipeline(transaction=False)
+        pipe.incr(VERSION_KEY.format(user_id=user_id))
+        _pin(pipe, [user_id])
+        pipe.execute()
+    except (RedisError, OSError) as exc:
+        logger.warning("Could not invalidate analytics cache: %s", exc)
+
+
+def _invalidate_users(user_ids: list) -> None:
+    # what update_user does through UserCache/ReplicaRouter, from sync code:
+    # drop the shared cached users and keep their reads on the primary
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(*(USER_KEY.format(user_id=user_id) for user_id in user_ids))
+        _pin(pipe, user_ids)
+        pipe.execute()
+    except (RedisError, OSError) as exc:
+        logger.warning("Could not invalidate cached users: %s", exc)
+
+
+@celery_app.task(ignore_result=True)
+def renormalize_user_currency(user_id: int) -> int:
+    """Re-express a user's transactions in their (new) base currency."""
+
+    async def run():
+        async with task_session() as db:
+            return await renormalize_base_amounts(db, user_id)
+
+    updated = asyncio.run(run())
+    _invalidate_analytics(user_id)
+    return updated
+
+
+@celery_app.task(ignore_result=True)
+def load_fx_rates(days: int = 7) -> int:
+    """Pull the last `days` days of rates from the configured provider and
+    convert the transactions that were waiting for them."""
+    end = date.today()
+    start = end - timedelta(days=days)
+
+    async def run():
+        async with task_session() as db:
+            loaded = await load_rates(db, get_provider(), start, end)
+            return loaded, await fill_missing_base_amounts(db, start)
+
+    loaded, user_ids = asyncio.run(run())
+    for user_id in user_ids:
+        _invalidate_analytics(user_id)
+    if user_ids:
+        logger.info("Filled missing base amounts for %s users", len(user_ids))
+    return loaded
+
+
+@celery_app.task(ignore_result=True)
+def ensure_transaction_partitions() -> list:
+    """Create next months' `transactions` partitions before rows arrive."""
+
+    async def run():
+        async with task_session() as db:
+            return await ensure_partitions(db, settings.TRANSACTIONS_PARTITIONS_AHEAD)
+
+    created = asyncio.run(run())
+    if created:
+        logger.info("Created transactions partitions: %s", ", ".join(created))
+    return created
+
+
+@celery_app.task(ignore_result=True, acks_late=True)
+def detect_recurring_shard(shard: int, shards: int) -> int:
+    """Refresh recurring patterns for users with id % shards == shard.
+
+    acks_late: if the worker dies mid-scan the task is redelivered and picks
+    up from the shard's checkpoint.
+    """
+
+    async def run():
+        async with task_session() as db:
+            return await scan_recurring(db, shard, shards)
+
+    processed = asyncio.run(run())
+    logger.info("Recurring scan %s/%s: %s users", shard, shards, processed)
+    return processed
+
+
+@celery_app.task(ignore_result=True)
+def detect_recurring_transactions() -> None:
+    """Fan the recurring-payment scan out over RECURRING_SHARDS tasks."""
+    for shard in range(settings.RECURRING_SHARDS):
+        detect_recurring_shard.delay(shard, settings.RECURRING_SHARDS)
+
+
+@celery_app.task(ignore_result=True, acks_late=True)
+def process_payment_event(event_id: int) -> None:
+    """Apply a stored LiqPay callback; a no-op for events already applied."""
+
+    async def run():
+        async with task_session() as db:
+            return await apply_payment_event(db, event_id)
+
+    user_id = asyncio.run(run())
+    if user_id is not None:
+        _invalidate_users([user_id])
+
+
+@celery_app.task(ignore_result=True)
+def retry_pending_payment_events(limit: int = 500) -> int:
+    """Re-queue stored callbacks whose task was lost (broker down, worker died)."""
+    received_before = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.PAYMENT_EVENTS_RETRY_AFTER_SECONDS
+    )
+
+    async def run():
+        async with task_session() as db:
+            return await get_pending_payment_event_ids(db, received_before, limit)
+
+    event_ids = asyncio.run(run())
+    for event_id in event_ids:
+        process_payment_event.delay(event_id)
+    if event_ids:
+        logger.warning("Re-queued %s pending payment events", len(event_ids))
+    return len(event_ids)
+
+
+@celery_app.task(ignore_result=True)
+def expire_lapsed_subscriptions() -> int:
+    """Unsubscribe users whose subscription ended, SUBSCRIPTION_EXPIRY_BATCH
+    users per UPDATE, and queue their bot notifications."""
+    ended_before = datetime.now() - timedelta(
+        hours=settings.SUBSCRIPTION_EXPIRY_GRACE_HOURS
+    )
+    batch = settings.SUBSCRIPTION_EXPIRY_BATCH
+
+    async def run():
+        expired = 0
+        async with task_session() as db:
+            while True:
+                rows = await expire_subscriptions(db, ended_before, batch)
+                if not rows:
+                    break
+                expired += len(rows)
+                _invalidate_users([row.id for row in rows])
+                chats = [
+                    (row.telegram_chat_id, row.language)
+                    for row in rows
+                    if row.telegram_chat_id
+                ]
+                if chats and settings.SUBSCRIPTION_EXPIRY_NOTIFY:
+                    notify_subscription_expired.delay(chats)
+                if len(rows) < batch:
+                    break
+        return expired
+
+    expired = asyncio.run(run())
+    if expired:
+        logger.info("Expired %s subscriptions", expired)
+    return expired
+
+
+@celery_app.task(ignore_result=True)
+def notify_subscription_expired(chats: list) -> int:
+    """Tell (telegram_chat_id, language) chats their subscription ended."""
+    messages = [
+        (chat_id, _(language, "subscription_expired")) for chat_id, language in chats
+    ]
+    return asyncio.run(send_messages(messages))
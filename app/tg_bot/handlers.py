@@ -4,9 +4,16 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from fastapi import Depends
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.analytics import get_insights
+from app.db.replica import read_session_for
 from app.db.session import async_session
+from app.crud import (
+    create_transaction,
+    get_transactions,
+    get_user_by_telegram_chat_id,
+)
 from app.models import Transaction, User
 from app.schemas import UserCreate
 from app.core.security import get_password_hash
@@ -38,10 +45,7 @@ class Registration(StatesGroup):
 @router.message(F.text == "/start")
 async def start_handler(message: types.Message, state: FSMContext):
     async with async_session() as db:
-        user = await db.execute(
-            select(User).where(User.telegram_chat_id == str(message.chat.id))
-        )
-        existing_user = user.scalar_one_or_none()
+        existing_user = await get_user_by_telegram_chat_id(db, str(message.chat.id))
 
         if existing_user:
             await message.answer(
@@ -165,10 +169,7 @@ async def input_category(message: types.Message, state: FSMContext):
 async def input_date(message: types.Message, state: FSMContext):
     async with async_session() as db:
         data = await state.get_data()
-        user = await db.execute(
-            select(User).where(User.telegram_chat_id == str(message.chat.id))
-        )
-        user_obj = user.scalar_one()
+        user_obj = await get_user_by_telegram_chat_id(db, str(message.chat.id))
 
         if message.text.lower() in ["today"]:
             tx_date = datetime.now()
@@ -187,8 +188,7 @@ async def input_date(message: types.Message, state: FSMContext):
             tx_date=tx_date,
             currency=user_obj.currency,
         )
-        db.add(tx)
-        await db.commit()
+        await create_transaction(db, tx, user_obj.currency)
         await message.answer("✅ Transaction saved!", reply_markup=MAIN_MARKUP)
         await state.clear()
 
@@ -196,51 +196,34 @@ async def input_date(message: types.Message, state: FSMContext):
 @router.message(F.text.lower() == "report")
 async def report_handler(message: types.Message):
     async with async_session() as db:
-        result = await db.execute(
-            select(User).where(User.telegram_chat_id == str(message.chat.id))
-        )
-        user = result.scalar_one()
-        lang = user.language
-        now = datetime.now()
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        income = await db.execute(
-            select(func.sum(Transaction.amount)).where(
-                Transaction.user_id == user.id,
-                Transaction.type == "income",
-                Transaction.tx_date >= start,
-            )
+        user = await get_user_by_telegram_chat_id(db, str(message.chat.id))
+    lang = user.language
+    async with read_session_for(user.id) as db:
+        insights = await get_insights(db, user, days=30)
+
+        text = (
+            f"📊 Monthly Report:\n\n"
+            f"Income: {insights['month_income']:.2f} {user.currency}\n"
+            f"Expense: {insights['month_expense']:.2f} {user.currency}\n\n"
+            f"🔥 Burn rate: {insights['burn_rate']:.2f} {user.currency}/day\n"
+            f"📈 Projected month balance: {insights['projected_month_balance']:.2f} {user.currency}"
         )
-        expense = await db.execute(
-            select(func.sum(Transaction.amount)).where(
-                Transaction.user_id == user.id,
-                Transaction.type == "expense",
-                Transaction.tx_date >= start,
+        if insights["anomalies"]:
+            top = insights["anomalies"][0]
+            text += (
+                f"\n\n⚠️ Unusual expense: {top['amount']:.2f} {user.currency}"
+                f" on {top['date']} in {top['category'] or 'uncategorized'}"
+                f" (usually {top['category_mean']:.2f})"
             )
-        )
-
-        income_total = income.scalar() or 0
-        expense_total = expense.scalar() or 0
-
-        text = f"📊 Monthly Report:\n\nIncome: {income_total:.2f} {user.currency}\nExpense: {expense_total:.2f} {user.currency}"
         await message.answer(text, reply_markup=MAIN_MARKUP)
 
 
 @router.message(F.text.lower() == "last transactions")
 async def last_transactions_handler(message: types.Message, state: FSMContext):
     async with async_session() as db:
-        result = await db.execute(
-            select(User).where(User.telegram_chat_id == str(message.chat.id))
-        )
-        user = result.scalar_one()
-
-        transactions = await db.execute(
-            select(Transaction)
-            .where(Transaction.user_id == user.id)
-            .order_by(Transaction.tx_date.desc())
-            .limit(5)
-        )
-        tx_list = transactions.scalars().all()
+        user = await get_user_by_telegram_chat_id(db, str(message.chat.id))
+    async with read_session_for(user.id) as db:
+        tx_list = await get_transactions(db, user.id, limit=5)
 
         if not tx_list:
             await message.answer("❌ No transactions found.")
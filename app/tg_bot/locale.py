@@ -10,6 +10,7 @@ LOCALES = {
         "saved": "✅ Transaction saved!",
         "date_format_error": "❌ Invalid date format. Use YYYY-MM-DD",
         "report_result": "📊 Report from {start} to {end}\nIncome: {income} | Expense: {expense}",
+        "subscription_expired": "⌛ Your subscription has ended. Renew it in the app to keep using AI features.",
     },
     "uk": {
         "start_new": "🔐 Ти ще не зареєстрований. Вкажи свій email:",
@@ -22,6 +23,7 @@ LOCALES = {
         "saved": "✅ Транзакцію збережено!",
         "date_format_error": "❌ Неправильний формат дати. Використовуй YYYY-MM-DD",
         "report_result": "📊 Звіт з {start} по {end}\nДоходи: {income} | Витрати: {expense}",
+        "subscription_expired": "⌛ Твоя підписка закінчилась. Віднови її в застосунку, щоб і далі користуватися AI-функціями.",
     }
 }
 
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from typing import Iterable, Tuple
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def send_messages(messages: Iterable[Tuple[str, str]]) -> int:
+    """Send (chat_id, text) pairs within Telegram's broadcast limit.
+
+    Opens its own Bot session, so it works from a Celery task's event loop.
+    Chats that can't be messaged (bot blocked, chat gone) are skipped.
+    Returns how many messages were delivered.
+    """
+    interval = 1 / settings.TELEGRAM_MESSAGES_PER_SECOND
+    loop = asyncio.get_running_loop()
+    sent = 0
+    async with Bot(
+        token=settings.TELEGRAM_BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode="HTML"),
+    ) as bot:
+        for chat_id, text in messages:
+            started = loop.time()
+            try:
+                try:
+                    await bot.send_message(chat_id, text)
+                except TelegramRetryAfter as exc:
+                    await asyncio.sleep(exc.retry_after)
+                    await bot.send_message(chat_id, text)
+                sent += 1
+            except TelegramAPIError as exc:
+                logger.info("Not notifying chat %s: %s", chat_id, exc)
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+    return sent
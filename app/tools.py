@@ -1 +1,24 @@
+import base64
+import json
 from datetime import datetime, timedelta
+
+
+def encode_cursor(tx_date: datetime, tx_id: int) -> str:
+    """Opaque keyset cursor pointing at the (tx_date, id) of the last row."""
+    raw = json.dumps([tx_date.isoformat(), tx_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of `encode_cursor`; raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tx_date, tx_id = json.loads(base64.urlsafe_b64decode(padded))
+        tx_date = datetime.fromisoformat(tx_date)
+        tx_id = int(tx_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    # tx_date is naive, as is every cursor we hand out
+    if tx_date.tzinfo is not None:
+        raise ValueError("Invalid cursor")
+    return tx_date, tx_id
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import update
+
+from app.core.security import create_access_token, token_claims
+from app.crud import get_user
+from app.db.session import async_session
+from app.models import User
+from scripts.bench_common import report, seed_user
+
+#  python -m scripts.fake_openai --port 8098 --first-token 1.5
+#  OPENAI_BASE_URL=http://localhost:8098/v1 uvicorn app.main:app
+#  python -m scripts.bench_ai --url http://localhost:8000 --clients 50
+#
+# Runs against a live server. --clients users ask /api/users/ai/generate at
+# the same time, plain and streamed, while /ping is probed. Reports the time
+# to the first streamed delta and to the complete answer; with a blocking
+# model client /ping waits for every model call in turn.
+
+EMAIL = "bench-ai@example.com"
+
+
+async def prepare() -> str:
+    async with async_session() as db:
+        user_id = await seed_user(db, EMAIL, 500)
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                is_subscribed=True,
+                subscription_end=datetime.now() + timedelta(days=30),
+            )
+        )
+        await db.commit()
+        return create_access_token(token_claims(await get_user(db, user_id)))
+
+
+async def ask(client: httpx.AsyncClient, headers: dict, stream: bool) -> tuple:
+    started = time.perf_counter()
+    first = None
+    body = {"question": "Where does my money go?", "stream": stream}
+    async with client.stream(
+        "POST", "/api/users/ai/generate", json=body, headers=headers
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first is None and line.startswith("data:"):
+                first = time.perf_counter()
+    done = time.perf_counter()
+    return ((first or done) - started) * 1000, (done - started) * 1000
+
+
+async def probe(client: httpx.AsyncClient, until: float) -> list:
+    samples = []
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        (await client.get("/ping")).raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.02)
+    return samples
+
+
+async def phase(client, headers: dict, clients: int, stream: bool) -> None:
+    started = time.perf_counter()
+    pings = asyncio.create_task(probe(client, started + 1))
+    results = await asyncio.gather(
+        *(ask(client, headers, stream) for _ in range(clients))
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f"{clients} concurrent {'streamed' if stream else 'plain'} answers, "
+        f"{elapsed:.2f} s wall"
+    )
+    if stream:
+        report("  first delta", [first for first, _ in results])
+    report("  complete answer", [total for _, total in results])
+    report("  GET /ping", await pings)
+
+
+async def main(url: str, clients: int):
+    headers = {"Authorization": f"Bearer {await prepare()}"}
+    limits = httpx.Limits(max_connections=clients + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        await client.get("/ping")
+        await phase(client, headers, clients, stream=False)
+        await phase(client, headers, clients, stream=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.clients))
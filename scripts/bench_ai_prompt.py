@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+from app.analytics import build_prompt_context
+from app.analytics.prompt import estimate_tokens
+from app.crud import get_transaction_rows, get_user
+from app.db.session import async_session
+from scripts.bench_common import measure, report, seed_user
+
+#  python -m scripts.bench_ai_prompt --rows 20000
+#
+# Builds the AI instructions for a seeded user the old way (every row of the
+# window as indented JSON, capped at 10,000 rows) and with
+# build_prompt_context, for a month, a quarter and a year, and prints their
+# size and build time. No model is called.
+
+EMAIL = "bench-ai-prompt@example.com"
+
+
+async def raw_rows_prompt(db, user_id: int, start: date, end: date) -> str:
+    rows = await get_transaction_rows(
+        db,
+        user_id,
+        start_date=start,
+        end_date=datetime.combine(end, datetime.max.time()),
+        limit=10000,
+    )
+    transactions = [
+        {
+            "id": row.id,
+            "tx_date": row.tx_date.strftime("%Y-%m-%d %H:%M:%S"),
+            "amount": row.amount,
+            "currency": row.currency,
+            "category": row.category,
+            "type": row.type,
+        }
+        for row in rows
+    ]
+    return f"""
+    You are a financial assistant. Based on the following transactions, answer the user's question.
+    Transactions:
+    {json.dumps(transactions, indent=2)}
+    """
+
+
+async def main(rows: int, iterations: int):
+    async with async_session() as db:
+        user = await get_user(db, await seed_user(db, EMAIL, rows, days=365))
+        end = date.today()
+        for label, days in (("month", 30), ("quarter", 90), ("year", 365)):
+            start = end - timedelta(days=days - 1)
+            raw = await raw_rows_prompt(db, user.id, start, end)
+            context = await build_prompt_context(db, user, start, end)
+            print(
+                f"{label}: raw rows ~{estimate_tokens(raw)} tokens, "
+                f"summary ~{context.tokens} tokens ({context.omitted} lines omitted)"
+            )
+            report(
+                f"  raw rows ({label})",
+                await measure(
+                    lambda: raw_rows_prompt(db, user.id, start, end), iterations
+                ),
+            )
+            report(
+                f"  summary ({label})",
+                await measure(
+                    lambda: build_prompt_context(db, user, start, end), iterations
+                ),
+            )
+        print("\n" + context.text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import rebuild_daily_totals
+from app.models import User
+
+# Shared helpers for the scripts/bench_*.py benchmarks.
+# They expect a migrated database at settings.DATABASE_URL and create a
+# dedicated user per benchmark, so they never touch real accounts.
+
+SEED_SQL = text(
+    """
+    INSERT INTO transactions
+        (user_id, type, amount, base_amount, currency, category, tx_date, created_at)
+    SELECT
+        :user_id,
+        CASE WHEN random() < 0.2 THEN 'income' ELSE 'expense' END,
+        amount,
+        amount,
+        'USD',
+        (ARRAY['Food', 'Transport', 'Utilities', 'Health', 'Salary', 'Other'])[1 + (g % 6)],
+        now() - (random() * :days || ' days')::interval,
+        now()
+    FROM (
+        SELECT g, round((random() * 500)::numeric, 2) AS amount
+        FROM generate_series(1, :rows) AS g
+    ) AS seed
+    """
+)
+
+
+async def seed_user(db: AsyncSession, email: str, rows: int, days: int = 730) -> int:
+    """Create (or reuse) a benchmark user holding exactly ``rows`` transactions."""
+    user_id = (
+        await db.execute(text("SELECT id FROM users WHERE email = :e"), {"e": email})
+    ).scalar()
+    if user_id is None:
+        user = User(email=email, full_name="bench")
+        db.add(user)
+        await db.flush()
+        user_id = user.id
+    existing = (
+        await db.execute(
+            text("SELECT count(*) FROM transactions WHERE user_id = :u"),
+            {"u": user_id},
+        )
+    ).scalar()
+    if existing != rows:
+        await db.execute(
+            text("DELETE FROM transactions WHERE user_id = :u"), {"u": user_id}
+        )
+        await db.execute(SEED_SQL, {"user_id": user_id, "rows": rows, "days": days})
+        await rebuild_daily_totals(db, user_id)
+    await db.commit()
+    await db.execute(text("ANALYZE transactions"))
+    return user_id
+
+
+async def measure(fn, iterations: int, warmup: int = 3) -> list:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name: str, samples: list) -> None:
+    ordered = sorted(samples)
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<32} p50={p50:8.2f} ms  p99={p99:8.2f} ms  n={len(ordered)}")
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+from datetime import datetime
+
+from app.crud import (
+    get_dashboard_analytics,
+    get_transactions_amount,
+    get_transactions_by_type,
+    get_transactions_by_type_grouped,
+)
+from app.db.session import async_session
+from scripts.bench_common import measure, report, seed_user
+
+#  python -m scripts.bench_dashboard --rows 100000 --iterations 200
+
+
+async def legacy_path(db, user_id: int, month_start, today_start, end_date):
+    for tx_type in ("income", "expense"):
+        await get_transactions_by_type(
+            db, user_id, tx_type, limit=5, start_date=month_start, end_date=end_date
+        )
+    for tx_type in ("income", "expense"):
+        await get_transactions_by_type_grouped(db, user_id, tx_type)
+    for start in (today_start, month_start):
+        for tx_type in ("income", "expense"):
+            await get_transactions_amount(
+                db, user_id, tx_type, start_date=start, end_date=end_date
+            )
+
+
+async def main(rows: int, iterations: int):
+    async with async_session() as db:
+        user_id = await seed_user(db, "bench-dashboard@example.com", rows)
+        now = datetime.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        legacy = await measure(
+            lambda: legacy_path(db, user_id, month_start, today_start, now),
+            iterations,
+        )
+        single = await measure(
+            lambda: get_dashboard_analytics(
+                db, user_id, month_start, today_start, now, last_limit=5
+            ),
+            iterations,
+        )
+    print(f"dashboard analytics, {rows} transactions")
+    report("8 sequential queries", legacy)
+    report("single statement", single)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
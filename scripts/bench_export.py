@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.api.endpoints.transactions import _encode_csv, _encode_ndjson
+from app.crud import get_transactions, stream_transactions
+from app.db.session import async_session
+from scripts.bench_common import seed_user
+
+#  python -m scripts.bench_export --rows 1000 100000 1000000
+
+
+async def run_streamed(db, user_id: int, fmt: str) -> int:
+    written = 0
+    async for rows in stream_transactions(db, user_id):
+        chunk = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+        written += len(chunk)
+    return written
+
+
+async def run_materialized(db, user_id: int, fmt: str) -> int:
+    # what an export built on get_transactions would have to do
+    transactions = await get_transactions(db, user_id, limit=None)
+    rows = [
+        (tx.id, tx.tx_date, tx.type, tx.amount, tx.currency, tx.category, tx.created_at)
+        for tx in transactions
+    ]
+    chunk = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+    return len(chunk)
+
+
+async def profile(name: str, rows: int, fn) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    written = await fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<22} rows={rows:>9}  {rows / elapsed:>10.0f} rows/s  "
+        f"peak={peak / 2**20:8.1f} MiB  output={written / 2**20:8.1f} MiB"
+    )
+
+
+async def main(sizes: list, fmt: str):
+    for rows in sizes:
+        async with async_session() as db:
+            user_id = await seed_user(db, f"bench-export-{rows}@example.com", rows)
+        async with async_session() as db:
+            await profile("streamed", rows, lambda: run_streamed(db, user_id, fmt))
+        async with async_session() as db:
+            await profile("materialized (ORM)", rows, lambda: run_materialized(db, user_id, fmt))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.format))
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.crud import create_transaction
+from app.db.session import async_session
+from app.importers import import_statement
+from app.models import Transaction
+from scripts.bench_common import seed_user
+
+#  python -m scripts.bench_import --rows 200000 --baseline-rows 2000
+
+
+def synthetic_csv(rows: int) -> io.BytesIO:
+    now = datetime.now()
+    lines = ["date,amount,category,currency"]
+    for i in range(rows):
+        tx_date = now - timedelta(minutes=random.randint(0, 60 * 24 * 365))
+        amount = round(random.uniform(-500, 500), 2) or 1
+        lines.append(f"{tx_date:%Y-%m-%d %H:%M:%S},{amount},Other,USD")
+    return io.BytesIO("\n".join(lines).encode())
+
+
+async def main(rows: int, baseline_rows: int):
+    async with async_session() as db:
+        user_id = await seed_user(db, "bench-import@example.com", 0)
+
+    payload = synthetic_csv(rows)
+    async with async_session() as db:
+        started = time.perf_counter()
+        result = await import_statement(db, user_id, payload, "csv", "USD")
+        elapsed = time.perf_counter() - started
+    print(
+        f"COPY import            rows={result['imported']:>8}  "
+        f"{result['imported'] / elapsed:>10.0f} rows/s"
+    )
+
+    async with async_session() as db:
+        started = time.perf_counter()
+        for i in range(baseline_rows):
+            await create_transaction(
+                db,
+                Transaction(
+                    user_id=user_id,
+                    type="expense",
+                    amount=i % 500,
+                    currency="USD",
+                    category="Other",
+                    tx_date=datetime.now(),
+                ),
+            )
+        elapsed = time.perf_counter() - started
+        print(
+            f"create_transaction     rows={baseline_rows:>8}  "
+            f"{baseline_rows / elapsed:>10.0f} rows/s"
+        )
+        await db.execute(
+            text("DELETE FROM transactions WHERE user_id = :u"), {"u": user_id}
+        )
+        await db.execute(
+            text("DELETE FROM daily_totals WHERE user_id = :u"), {"u": user_id}
+        )
+        await db.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.baseline_rows))
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import calendar
+import math
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import Float, cast, select
+
+from app.analytics import TransactionFrame, compute_insights, frame_start
+from app.core.config import settings
+from app.db.session import async_session
+from app.models import Transaction
+from scripts.bench_common import measure, report, seed_user
+
+#  python -m scripts.bench_insights --rows 10000 100000 1000000 --days 365
+#
+# "python" is the row-at-a-time baseline: fetch one tuple per transaction and
+# aggregate with dicts and loops. "numpy" is app.analytics: one row of
+# Postgres arrays decoded into columns and aggregated with vectorized ops.
+# Both must agree on every figure before anything is timed.
+
+
+async def fetch_rows(db, user_id: int, start: date, end: date) -> list:
+    result = await (await db.connection()).execute(
+        select(
+            Transaction.id,
+            Transaction.tx_date,
+            cast(Transaction.base_amount, Float),
+            Transaction.type,
+            Transaction.category,
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.tx_date >= start,
+            Transaction.tx_date < end + timedelta(days=1),
+            Transaction.base_amount.is_not(None),
+        )
+    )
+    return result.all()
+
+
+def python_insights(rows: list, start: date, today: date, days: int) -> dict:
+    n_days = (today - start).days + 1
+    income, expense = [0.0] * n_days, [0.0] * n_days
+    by_category = defaultdict(list)
+    for tx_id, tx_date, amount, tx_type, category in rows:
+        day = (tx_date.date() - start).days
+        if tx_type == "expense":
+            expense[day] += amount
+            by_category[category or ""].append((tx_id, day, amount))
+        else:
+            income[day] += amount
+
+    def rolling(window: int) -> list:
+        out, total = [], 0.0
+        for index, value in enumerate(expense):
+            total += value
+            if index >= window:
+                total -= expense[index - window]
+            out.append(total / min(index + 1, window))
+        return out
+
+    avg_7d, avg_30d = rolling(7), rolling(30)
+    now = n_days - 1
+    month_first = now - today.day + 1
+    month_expense = sum(expense[month_first:])
+    month_income = sum(income[month_first:])
+    burn_rate = month_expense / today.day
+    remaining = calendar.monthrange(today.year, today.month)[1] - today.day
+    projected = month_expense + burn_rate * remaining
+    first = now - days + 1
+
+    anomalies = []
+    for category, items in by_category.items():
+        if len(items) < settings.INSIGHTS_MIN_CATEGORY_SIZE:
+            continue
+        mean = sum(amount for _, _, amount in items) / len(items)
+        var = sum(amount * amount for _, _, amount in items) / len(items) - mean**2
+        std = math.sqrt(max(var, 0))
+        if std <= 1e-9:
+            continue
+        for tx_id, day, amount in items:
+            zscore = (amount - mean) / std
+            if day >= first and abs(zscore) >= settings.INSIGHTS_ZSCORE_THRESHOLD:
+                anomalies.append((tx_id, zscore))
+    anomalies.sort(key=lambda item: -abs(item[1]))
+
+    return {
+        "month_income": round(month_income, 2),
+        "month_expense": round(month_expense, 2),
+        "burn_rate": round(burn_rate, 2),
+        "projected_month_balance": round(month_income - projected, 2),
+        "avg_7d": [round(value, 2) for value in avg_7d[first:]],
+        "avg_30d": [round(value, 2) for value in avg_30d[first:]],
+        "anomalies": {
+            tx_id for tx_id, _ in anomalies[: settings.INSIGHTS_MAX_ANOMALIES]
+        },
+    }
+
+
+def same(expected: dict, actual: dict) -> bool:
+    def close(a, b):
+        return abs(a - b) <= 0.011
+
+    scalars = ("month_income", "month_expense", "burn_rate", "projected_month_balance")
+    return (
+        all(close(expected[key], actual[key]) for key in scalars)
+        and all(
+            close(a, point[key])
+            for key in ("avg_7d", "avg_30d")
+            for a, point in zip(expected[key], actual["points"], strict=True)
+        )
+        and expected["anomalies"] == {item["id"] for item in actual["anomalies"]}
+    )
+
+
+async def bench(rows: int, days: int, iterations: int) -> None:
+    today = date.today()
+    start = frame_start(today, days)
+    async with async_session() as db:
+        user_id = await seed_user(
+            db, f"bench-insights-{rows}@example.com", rows, days=(today - start).days
+        )
+
+        async def load():
+            return await TransactionFrame.load(db, user_id, start, today)
+
+        frame = await load()
+        plain = await fetch_rows(db, user_id, start, today)
+        if not same(
+            python_insights(plain, start, today, days),
+            compute_insights(frame, today, days),
+        ):
+            raise SystemExit(f"❌ numpy and python insights differ at {rows} rows")
+
+        async def compute():
+            compute_insights(frame, today, days)
+
+        async def numpy_total():
+            compute_insights(await load(), today, days)
+
+        async def python_compute():
+            python_insights(plain, start, today, days)
+
+        async def python_total():
+            python_insights(
+                await fetch_rows(db, user_id, start, today), start, today, days
+            )
+
+        results = [
+            ("numpy: load columns", await measure(load, iterations, warmup=1)),
+            ("numpy: compute", await measure(compute, iterations, warmup=1)),
+            ("numpy: total", await measure(numpy_total, iterations, warmup=1)),
+            ("python: compute", await measure(python_compute, iterations, warmup=1)),
+            ("python: total", await measure(python_total, iterations, warmup=1)),
+        ]
+    print(f"insights over {days} days, {len(frame)} transactions loaded")
+    for name, samples in results:
+        report(name, samples)
+
+
+async def main(sizes: list, days: int, iterations: int):
+    started = time.perf_counter()
+    for rows in sizes:
+        await bench(rows, days, iterations)
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.days, args.iterations))
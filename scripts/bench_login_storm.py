@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import update
+
+from app.core.security import create_access_token, get_password_hash, token_claims
+from app.crud import get_user
+from app.db.session import async_session
+from app.models import User
+from scripts.bench_common import report, seed_user
+
+#  python -m scripts.bench_login_storm --url http://localhost:8000 --logins 16
+#
+# Runs against a live server. Probes /ping and GET /api/transactions at a
+# steady pace, first alone and then while --logins clients hammer
+# /api/users/login. If password hashing blocks the event loop the probes'
+# p99 jumps to the bcrypt cost; with hashing on the thread pool it stays
+# flat.
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-login-password"
+
+
+async def prepare() -> str:
+    async with async_session() as db:
+        user_id = await seed_user(db, EMAIL, 1000)
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(hashed_password=get_password_hash(PASSWORD))
+        )
+        await db.commit()
+        return create_access_token(token_claims(await get_user(db, user_id)))
+
+
+async def probe(client: httpx.AsyncClient, url: str, headers: dict, until: float):
+    samples = []
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.02)
+    return samples
+
+
+async def login(client: httpx.AsyncClient, until: float) -> int:
+    done = 0
+    while time.perf_counter() < until:
+        response = await client.post(
+            "/api/users/login", data={"username": EMAIL, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        done += 1
+    return done
+
+
+async def phase(client, token: str, seconds: float, logins: int) -> None:
+    until = time.perf_counter() + seconds
+    headers = {"Authorization": f"Bearer {token}"}
+    results = await asyncio.gather(
+        probe(client, "/ping", {}, until),
+        probe(client, "/api/transactions?limit=50", headers, until),
+        *(login(client, until) for _ in range(logins)),
+    )
+    print(f"{logins} concurrent login clients, {sum(results[2:])} logins")
+    report("  GET /ping", results[0])
+    report("  GET /api/transactions", results[1])
+
+
+async def main(url: str, logins: int, seconds: float):
+    token = await prepare()
+    limits = httpx.Limits(max_connections=logins + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        await client.get("/ping")
+        await phase(client, token, seconds, 0)
+        await phase(client, token, seconds, logins)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.logins, args.seconds))
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+
+from app.crud import get_transactions
+from app.db.session import async_session
+from scripts.bench_common import measure, report, seed_user
+
+#  python -m scripts.bench_pagination --rows 200000 --limit 100 --page 1000
+
+
+async def main(rows: int, limit: int, page: int, iterations: int):
+    async with async_session() as db:
+        user_id = await seed_user(db, "bench-pagination@example.com", rows)
+        # position of the last row of the page before `page`, i.e. the cursor
+        # a client would hold after walking there
+        previous = await get_transactions(
+            db, user_id, skip=(page - 2) * limit, limit=limit
+        )
+        after = (previous[-1].tx_date, previous[-1].id)
+
+        results = {
+            "offset, page 1": lambda: get_transactions(db, user_id, limit=limit),
+            f"offset, page {page}": lambda: get_transactions(
+                db, user_id, skip=(page - 1) * limit, limit=limit
+            ),
+            "cursor, page 1": lambda: get_transactions(db, user_id, limit=limit),
+            f"cursor, page {page}": lambda: get_transactions(
+                db, user_id, limit=limit, after=after
+            ),
+        }
+        samples = {name: await measure(fn, iterations) for name, fn in results.items()}
+    print(f"GET /api/transactions, {rows} transactions, {limit} per page")
+    for name, values in samples.items():
+        report(name, values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.page, args.iterations))
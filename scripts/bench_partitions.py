@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from app.crud import (
+    get_dashboard_analytics,
+    get_transactions,
+    get_transactions_by_type,
+    rebuild_daily_totals,
+)
+from app.db.partitions import create_partitions
+from app.db.session import async_session
+from app.models import Transaction
+from scripts.bench_common import measure, report
+
+#  python -m scripts.bench_partitions --rows 50000000 --users 5000
+#
+# Seeds `rows` transactions spread over `users` users and `days` days, then
+# times month-bounded queries. Run it once on the partitioned schema and once
+# after `alembic downgrade 9e4a7b2c1f53` (same data, plain table) to compare.
+
+EMAIL = "bench-partitions-{}@example.com"
+
+USERS_SQL = text(
+    """
+    INSERT INTO users (email, full_name, is_superuser, language, currency,
+                       is_active, is_registered_from_telegram)
+    SELECT format(:email, g), 'bench', false, 'en', 'USD', true, false
+    FROM generate_series(1, :users) AS g
+    ON CONFLICT (email) DO NOTHING
+    """
+)
+
+SEED_SQL = text(
+    """
+    INSERT INTO transactions
+        (user_id, type, amount, base_amount, currency, category, tx_date, created_at)
+    SELECT
+        ids[1 + g % cardinality(ids)],
+        CASE WHEN random() < 0.2 THEN 'income' ELSE 'expense' END,
+        amount,
+        amount,
+        'USD',
+        (ARRAY['Food', 'Transport', 'Utilities', 'Health', 'Salary', 'Other'])[1 + (g % 6)],
+        now() - (random() * :days || ' days')::interval,
+        now()
+    FROM (
+        SELECT g, round((random() * 500)::numeric, 2) AS amount
+        FROM generate_series(CAST(:first AS bigint), CAST(:last AS bigint)) AS g
+    ) AS seed,
+    (SELECT array_agg(id ORDER BY id) AS ids FROM users WHERE email LIKE :pattern) AS u
+    """
+)
+
+
+async def seed(db, rows: int, users: int, days: int, chunk: int) -> list:
+    await db.execute(USERS_SQL, {"email": EMAIL.format("%s"), "users": users})
+    await db.commit()
+    user_ids = (
+        await db.execute(
+            text("SELECT id FROM users WHERE email LIKE :p ORDER BY id"),
+            {"p": EMAIL.format("%")},
+        )
+    ).scalars().all()
+    existing = await db.scalar(
+        select(func.count()).where(Transaction.user_id.in_(user_ids))
+    )
+    if existing == rows:
+        return user_ids
+    if await db.scalar(text("SELECT to_regclass('transactions_default')")):
+        await create_partitions(db, date.today() - timedelta(days=days), date.today())
+    await db.execute(
+        text("DELETE FROM transactions WHERE user_id = ANY(:ids)"), {"ids": user_ids}
+    )
+    await db.commit()
+    started = time.perf_counter()
+    for first in range(1, rows + 1, chunk):
+        await db.execute(
+            SEED_SQL,
+            {
+                "first": first,
+                "last": min(first + chunk - 1, rows),
+                "days": days,
+                "pattern": EMAIL.format("%"),
+            },
+        )
+        await db.commit()
+        print(f"  seeded {min(first + chunk - 1, rows)}/{rows}", flush=True)
+    await rebuild_daily_totals(db)
+    await db.execute(text("ANALYZE transactions"))
+    print(f"  seeding took {time.perf_counter() - started:.0f} s")
+    return user_ids
+
+
+async def scanned_partitions(db, query) -> int:
+    """How many relations the plan actually reads for ``query``."""
+    compiled = query.compile(
+        dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = (
+        await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    ).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    relations, stack = set(), [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return len(relations)
+
+
+async def main(rows: int, users: int, days: int, iterations: int, chunk: int):
+    async with async_session() as db:
+        user_ids = await seed(db, rows, users, days, chunk)
+        partitioned = await db.scalar(text("SELECT to_regclass('transactions_default')"))
+        now = datetime.now()
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        user_cycle = iter(user_ids * (iterations + 10))
+
+        month_total = (
+            select(func.sum(Transaction.amount))
+            .where(Transaction.tx_date >= month_start, Transaction.tx_date <= now)
+        )
+        print(
+            f"month-bounded queries, {rows} transactions, {len(user_ids)} users, "
+            f"{'partitioned' if partitioned else 'plain table'}; "
+            f"month total reads {await scanned_partitions(db, month_total)} relation(s)"
+        )
+        report(
+            "get_transactions (month)",
+            await measure(
+                lambda: get_transactions(
+                    db, next(user_cycle), start_date=month_start, end_date=now, limit=50
+                ),
+                iterations,
+            ),
+        )
+        report(
+            "get_transactions_by_type",
+            await measure(
+                lambda: get_transactions_by_type(
+                    db, next(user_cycle), "expense", 5, month_start, now
+                ),
+                iterations,
+            ),
+        )
+        report(
+            "get_dashboard_analytics",
+            await measure(
+                lambda: get_dashboard_analytics(
+                    db, next(user_cycle), month_start, today_start, now
+                ),
+                iterations,
+            ),
+        )
+        report(
+            "month total, all users",
+            await measure(lambda: db.execute(month_total), max(iterations // 10, 5)),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=1825)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=1_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.users, args.days, args.iterations, args.chunk))
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import statistics
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.api.endpoints.transactions import TRANSACTION_OUT_FIELDS
+from app.crud import get_transaction_rows, get_transactions
+from app.db.session import async_session
+from app.schemas import TransactionOut
+from scripts.bench_common import measure, report, seed_user
+
+#  python -m scripts.bench_serialization --rows 10000 --iterations 50
+#
+# "ORM + response model" is what GET /api/transactions used to do: load ORM
+# instances, validate them through TransactionOut and dump JSON. "rows +
+# orjson" is the current path: column tuples straight to orjson.
+
+TRANSACTIONS_OUT = TypeAdapter(List[TransactionOut])
+
+
+def encode_models(transactions) -> bytes:
+    return TRANSACTIONS_OUT.dump_json(TRANSACTIONS_OUT.validate_python(transactions))
+
+
+def encode_rows(rows) -> bytes:
+    return orjson.dumps([dict(zip(TRANSACTION_OUT_FIELDS, row)) for row in rows])
+
+
+def rows_per_second(rows: int, samples: list) -> str:
+    return f"{rows / (statistics.median(samples) / 1000):>12,.0f} rows/s"
+
+
+async def main(rows: int, iterations: int):
+    async with async_session() as db:
+        user_id = await seed_user(db, "bench-serialization@example.com", rows)
+        start, end = datetime.now() - timedelta(days=3650), datetime.now()
+
+        async def fetch_models():
+            db.expunge_all()
+            return await get_transactions(
+                db, user_id, start_date=start, end_date=end, limit=rows
+            )
+
+        async def fetch_rows():
+            return await get_transaction_rows(
+                db, user_id, start_date=start, end_date=end, limit=rows
+            )
+
+        transactions, plain = await fetch_models(), await fetch_rows()
+        if json.loads(encode_models(transactions)) != json.loads(encode_rows(plain)):
+            raise SystemExit("❌ the two paths produce different JSON")
+
+        async def serialize_models():
+            encode_models(transactions)
+
+        async def serialize_rows():
+            encode_rows(plain)
+
+        async def end_to_end_models():
+            encode_models(await fetch_models())
+
+        async def end_to_end_rows():
+            encode_rows(await fetch_rows())
+
+        results = [
+            (
+                "serialize: ORM + response model",
+                await measure(serialize_models, iterations),
+            ),
+            ("serialize: rows + orjson", await measure(serialize_rows, iterations)),
+            ("fetch+serialize: ORM", await measure(end_to_end_models, iterations)),
+            ("fetch+serialize: rows", await measure(end_to_end_rows, iterations)),
+        ]
+    print(f"transaction list response, {rows} rows")
+    for name, samples in results:
+        report(name, samples)
+        print(f"{'':<32} {rows_per_second(rows, samples)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.iterations))
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import expire_subscriptions
+from app.db.session import engine
+
+#  python -m scripts.bench_subscription_expiry --users 1000000 --lapsed 0.05
+#
+# Seeds `users` subscribed benchmark users, `lapsed` of them with a
+# subscription that ended yesterday, then expires them in
+# SUBSCRIPTION_EXPIRY_BATCH-sized UPDATEs the way the beat task does and
+# prints the plan of one batch. Everything runs in one transaction that is
+# rolled back at the end (the sweep's commits become savepoints), so no
+# benchmark user is left behind.
+
+EMAIL = "bench-expiry-%s@example.com"
+
+USERS_SQL = text(
+    """
+    INSERT INTO users (email, full_name, is_superuser, language, currency,
+                       is_active, is_registered_from_telegram, is_subscribed,
+                       subscription_end, cancel_at_period_end)
+    SELECT format(:email, g), 'bench', false, 'en', 'USD', true, false,
+           random() < :active,
+           CASE WHEN g % 1000 < :lapsed_per_mille THEN now() - interval '1 day'
+                ELSE now() + (1 + g % 30 || ' days')::interval END,
+           false
+    FROM generate_series(1, :users) AS g
+    ON CONFLICT (email) DO NOTHING
+    """
+)
+
+
+async def main(users: int, lapsed: float, active: float, batch: int):
+    async with engine.connect() as conn:
+        outer = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        await db.execute(
+            USERS_SQL,
+            {
+                "email": EMAIL,
+                "users": users,
+                "lapsed_per_mille": int(lapsed * 1000),
+                "active": active,
+            },
+        )
+        await db.execute(text("ANALYZE users"))
+        plan = await db.execute(
+            text(
+                """
+                EXPLAIN UPDATE users SET is_subscribed = false
+                WHERE id = ANY(ARRAY(
+                    SELECT id FROM users
+                    WHERE is_subscribed IS true AND subscription_end < now()
+                    LIMIT :batch FOR UPDATE SKIP LOCKED))
+                """
+            ),
+            {"batch": batch},
+        )
+        print("\n".join(row[0] for row in plan))
+
+        started = time.perf_counter()
+        expired = batches = 0
+        while True:
+            rows = await expire_subscriptions(db, datetime.now(), batch)
+            expired += len(rows)
+            batches += 1
+            if len(rows) < batch:
+                break
+        elapsed = time.perf_counter() - started
+        print(
+            f"expired {expired} of {users} users in {batches} batches, "
+            f"{elapsed:.2f} s ({expired / elapsed:.0f} users/s)"
+        )
+
+        await db.close()
+        await outer.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lapsed", type=float, default=0.05)
+    parser.add_argument("--active", type=float, default=0.5)
+    parser.add_argument("--batch", type=int, default=settings.SUBSCRIPTION_EXPIRY_BATCH)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.lapsed, args.active, args.batch))
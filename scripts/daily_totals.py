@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+
+from app.crud import check_daily_totals, rebuild_daily_totals
+from app.db.session import async_session
+
+#  sudo docker exec backend python -m scripts.daily_totals check
+#  sudo docker exec backend python -m scripts.daily_totals rebuild --user-id 42
+
+
+async def check(user_id: int = None) -> int:
+    async with async_session() as db:
+        mismatches = await check_daily_totals(db, user_id)
+    for row in mismatches:
+        print(
+            f"user={row.user_id} day={row.day} type={row.type} "
+            f"category={row.category!r} currency={row.currency}: "
+            f"expected {row.expected_amount}/{row.expected_base_amount}/"
+            f"{row.expected_count}, "
+            f"got {row.actual_amount}/{row.actual_base_amount}/{row.actual_count}"
+        )
+    print(f"{'❌' if mismatches else '✅'} {len(mismatches)} mismatching rollup rows")
+    return 1 if mismatches else 0
+
+
+async def rebuild(user_id: int = None) -> int:
+    async with async_session() as db:
+        await rebuild_daily_totals(db, user_id)
+    print(f"✅ daily_totals rebuilt for {'user ' + str(user_id) if user_id else 'all users'}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild daily_totals")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    command = check if args.command == "check" else rebuild
+    raise SystemExit(asyncio.run(command(args.user_id)))
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import base64
+import json
+import random
+
+import uvicorn
+from fastapi import FastAPI, Form
+from fastapi.responses import JSONResponse
+
+from app.core.billing import generate_signature
+
+#  python -m scripts.fake_liqpay --port 8099 [--latency 2 --fail-rate 0.3]
+#  LIQPAY_API_URL=http://localhost:8099/api/request uvicorn app.main:app
+#
+# Local stand-in for the LiqPay API request endpoint. Checks the signature
+# like LiqPay does and answers "unsubscribe" with status "unsubscribed".
+# --latency delays every answer, --fail-rate answers that share with 503 and
+# --hang never answers, to exercise the client's timeouts, retries and
+# circuit breaker. POST /control?latency=..&fail_rate=..&hang=.. changes
+# them while the server runs.
+
+app = FastAPI()
+behaviour = {"latency": 0.0, "fail_rate": 0.0, "hang": False, "requests": 0}
+
+
+@app.post("/control")
+async def control(latency: float = None, fail_rate: float = None, hang: bool = None):
+    for key, value in (("latency", latency), ("fail_rate", fail_rate), ("hang", hang)):
+        if value is not None:
+            behaviour[key] = value
+    return behaviour
+
+
+@app.post("/api/request")
+async def api_request(data: str = Form(...), signature: str = Form(...)):
+    behaviour["requests"] += 1
+    if behaviour["hang"]:
+        await asyncio.Event().wait()
+    await asyncio.sleep(behaviour["latency"])
+    if random.random() < behaviour["fail_rate"]:
+        return JSONResponse({"detail": "injected failure"}, status_code=503)
+    if signature != generate_signature(data):
+        return {"result": "error", "err_code": "err_signature", "status": "error"}
+    payload = json.loads(base64.b64decode(data))
+    if payload.get("action") != "unsubscribe":
+        return {"result": "error", "err_code": "err_action", "status": "error"}
+    return {
+        "result": "ok",
+        "status": "unsubscribed",
+        "action": "unsubscribe",
+        "order_id": payload.get("order_id"),
+        "version": payload.get("version"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--hang", action="store_true")
+    args = parser.parse_args()
+    behaviour.update(latency=args.latency, fail_rate=args.fail_rate, hang=args.hang)
+    uvicorn.run(app, port=args.port, log_level="warning")
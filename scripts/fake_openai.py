@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+#  python -m scripts.fake_openai --port 8098 [--first-token 1.5 --token-delay 0.02]
+#  OPENAI_BASE_URL=http://localhost:8098/v1 uvicorn app.main:app
+#
+# Offline stand-in for the OpenAI Responses API (POST /v1/responses), plain
+# and streamed. Every answer waits --first-token seconds, then produces
+# --tokens words --token-delay seconds apart, so latency and concurrency of
+# the AI endpoint can be measured without the real service.
+
+app = FastAPI()
+config = {"first_token": 1.0, "token_delay": 0.02, "tokens": 50}
+
+
+def _words(question: str):
+    words = f"Fake answer to: {question}".split()
+    for i in range(config["tokens"]):
+        yield (" " if i else "") + words[i % len(words)]
+
+
+def _response(response_id: str, text: str, model: str, status: str) -> dict:
+    return {
+        "id": response_id,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": status,
+        "output": [
+            {
+                "id": f"msg_{response_id}",
+                "type": "message",
+                "role": "assistant",
+                "status": status,
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+    }
+
+
+def _event(payload: dict) -> str:
+    return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    body = await request.json()
+    response_id = f"resp_{uuid4().hex}"
+    model = body.get("model", "fake")
+    question = str(body.get("input", ""))
+    await asyncio.sleep(config["first_token"])
+    if not body.get("stream"):
+        await asyncio.sleep(config["token_delay"] * config["tokens"])
+        return _response(response_id, "".join(_words(question)), model, "completed")
+
+    async def events():
+        yield _event(
+            {
+                "type": "response.created",
+                "sequence_number": 0,
+                "response": _response(response_id, "", model, "in_progress"),
+            }
+        )
+        text = ""
+        for number, word in enumerate(_words(question), start=1):
+            text += word
+            yield _event(
+                {
+                    "type": "response.output_text.delta",
+                    "sequence_number": number,
+                    "item_id": f"msg_{response_id}",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": word,
+                    "logprobs": [],
+                }
+            )
+            await asyncio.sleep(config["token_delay"])
+        yield _event(
+            {
+                "type": "response.completed",
+                "sequence_number": config["tokens"] + 1,
+                "response": _response(response_id, text, model, "completed"),
+            }
+        )
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--first-token", type=float, default=1.0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=50)
+    args = parser.parse_args()
+    config.update(
+        first_token=args.first_token, token_delay=args.token_delay, tokens=args.tokens
+    )
+    uvicorn.run(app, port=args.port, log_level="warning")
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from app.core.fx import FileFxRateProvider, get_provider, load_rates
+from app.crud import fill_missing_base_amounts, renormalize_base_amounts
+from app.db.session import async_session
+
+#  sudo docker exec backend python -m scripts.fx load --days 30
+#  sudo docker exec backend python -m scripts.fx load --file rates.csv --start 2024-01-01
+#  sudo docker exec backend python -m scripts.fx renormalize --user-id 42
+
+
+async def load(args) -> int:
+    provider = FileFxRateProvider(args.file) if args.file else get_provider()
+    end = args.end or date.today()
+    start = args.start or end - timedelta(days=args.days)
+    async with async_session() as db:
+        count = await load_rates(db, provider, start, end)
+        user_ids = await fill_missing_base_amounts(db, start)
+    print(f"✅ {count} rates loaded for {start}..{end}")
+    if user_ids:
+        print(f"✅ missing base amounts filled for {len(user_ids)} users")
+    return 0
+
+
+async def renormalize(args) -> int:
+    async with async_session() as db:
+        count = await renormalize_base_amounts(db, args.user_id)
+    print(f"✅ {count} transactions renormalized")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load FX rates or recompute base amounts")
+    parser.add_argument("command", choices=["load", "renormalize"])
+    parser.add_argument("--file", default=None, help="rates file instead of FX_PROVIDER")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    command = load if args.command == "load" else renormalize
+    raise SystemExit(asyncio.run(command(args)))
@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+from datetime import date
+
+from app.core.config import settings
+from app.db.partitions import (
+    create_partitions,
+    detach_partitions,
+    ensure_partitions,
+    list_partitions,
+)
+from app.db.session import async_session
+
+#  sudo docker exec backend python -m scripts.partitions list
+#  sudo docker exec backend python -m scripts.partitions ensure
+#  sudo docker exec backend python -m scripts.partitions create --start 2019-01-01 --end 2019-12-31
+#  sudo docker exec backend python -m scripts.partitions detach --before 2020-01-01 [--drop]
+
+
+async def main(args) -> int:
+    async with async_session() as db:
+        if args.command == "list":
+            for name, _ in await list_partitions(db):
+                print(name)
+            return 0
+        if args.command == "ensure":
+            names = await ensure_partitions(db, settings.TRANSACTIONS_PARTITIONS_AHEAD)
+        elif args.command == "create":
+            names = await create_partitions(db, args.start, args.end or args.start)
+        else:
+            names = await detach_partitions(db, args.before, drop=args.drop)
+    print(f"✅ {args.command}: {', '.join(names) or 'nothing to do'}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage transactions partitions")
+    parser.add_argument("command", choices=["list", "ensure", "create", "detach"])
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--before", type=date.fromisoformat, default=None)
+    parser.add_argument("--drop", action="store_true")
+    args = parser.parse_args()
+    if args.command == "create" and not args.start:
+        parser.error("create needs --start")
+    if args.command == "detach" and not args.before:
+        parser.error("detach needs --before")
+    raise SystemExit(asyncio.run(main(args)))
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.analytics import scan_recurring
+from app.db.session import async_session
+from app.models import JobCheckpoint
+
+#  sudo docker exec backend python -m scripts.recurring status
+#  sudo docker exec backend python -m scripts.recurring enqueue
+#  sudo docker exec backend python -m scripts.recurring run [--shard 0 --shards 4]
+#
+# "enqueue" fans the scan out over Celery workers like the nightly beat job;
+# "run" scans one shard in this process (resuming from its checkpoint).
+
+
+async def main(args) -> int:
+    if args.command == "enqueue":
+        from app.tasks import detect_recurring_transactions
+
+        detect_recurring_transactions.delay()
+        print("✅ recurring scan enqueued")
+        return 0
+    async with async_session() as db:
+        if args.command == "status":
+            result = await db.execute(
+                select(JobCheckpoint)
+                .where(JobCheckpoint.name.like("recurring:%"))
+                .order_by(JobCheckpoint.name)
+            )
+            for checkpoint in result.scalars():
+                print(
+                    f"{checkpoint.name:<16} after user {checkpoint.position:<10} "
+                    f"{checkpoint.updated_at:%Y-%m-%d %H:%M:%S}"
+                )
+            return 0
+        started = time.perf_counter()
+        processed = await scan_recurring(db, args.shard, args.shards)
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ shard {args.shard}/{args.shards}: {processed} users in {elapsed:.1f}s "
+        f"({processed / max(elapsed, 1e-9):,.0f} users/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recurring payments detection")
+    parser.add_argument("command", choices=["status", "enqueue", "run"])
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=1)
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,160 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import crud
+from app.db.session import async_session, engine
+from app.models import Transaction
+from app.schemas import TransactionCreate
+from scripts.bench_common import seed_user
+
+# Query-plan regression check: runs every CRUD query against a seeded
+# database, EXPLAINs the exact SQL it sent and fails when one of them reads
+# a per-user table with a sequential scan. Sequential scans are disabled for
+# the EXPLAIN so a small seed still shows whether a usable index exists.
+#
+#  python -m pytest tests/test_query_plans.py   (use a scratch database)
+#
+# Skipped when settings.DATABASE_URL can't be reached.
+
+# one loop for the module: the pooled engine's connections are bound to it
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+WATCHED_TABLES = {"transactions", "users", "daily_totals", "orders"}
+STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+SEED_ROWS = 20_000
+EMAIL = "bench-plans@example.com"
+CHAT_ID = "plan-check"
+
+
+@contextmanager
+def capture_statements():
+    statements = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if statement.lstrip().upper().startswith(STATEMENTS):
+            # one parameter set is enough to plan an executemany; batched
+            # "insertmanyvalues" INSERTs already come with a single flat one
+            if executemany and isinstance(parameters, list):
+                parameters = parameters[0]
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seq_scans(plan: dict) -> list:
+    found = []
+    if (
+        plan.get("Node Type") == "Seq Scan"
+        and plan.get("Relation Name") in WATCHED_TABLES
+    ):
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def probes(user_id: int) -> dict:
+    now = datetime.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "get_user": lambda db: crud.get_user(db, user_id),
+        "get_user_by_email": lambda db: crud.get_user_by_email(db, EMAIL),
+        "get_user_by_telegram_chat_id": lambda db: crud.get_user_by_telegram_chat_id(
+            db, CHAT_ID
+        ),
+        "get_order": lambda db: crud.get_order(db, "missing-order-key"),
+        "get_transaction": lambda db: crud.get_transaction(db, 1, user_id),
+        "get_transactions": lambda db: crud.get_transactions(
+            db, user_id, start_date=month_start, end_date=now
+        ),
+        "get_transactions (cursor)": lambda db: crud.get_transactions(
+            db, user_id, after=(now - timedelta(days=30), 1)
+        ),
+        "get_transactions_by_type": lambda db: crud.get_transactions_by_type(
+            db, user_id, "expense", limit=5, start_date=month_start, end_date=now
+        ),
+        "get_transactions_by_type_grouped": lambda db: crud.get_transactions_by_type_grouped(
+            db, user_id, "expense"
+        ),
+        "get_transactions_amount": lambda db: crud.get_transactions_amount(
+            db, user_id, "income", start_date=month_start, end_date=now
+        ),
+        "get_transactions_timeseries": lambda db: crud.get_transactions_timeseries(
+            db, user_id, now - timedelta(days=90), now, "week"
+        ),
+        "get_category_breakdown": lambda db: crud.get_category_breakdown(
+            db, user_id, month_start, now
+        ),
+        "get_dashboard_analytics": lambda db: crud.get_dashboard_analytics(
+            db, user_id, month_start, today_start, now
+        ),
+        "create_transaction": lambda db: crud.create_transaction(
+            db,
+            Transaction(
+                user_id=user_id, type="expense", amount=1, currency="USD", tx_date=now
+            ),
+        ),
+        "create_transactions": lambda db: crud.create_transactions(
+            db,
+            user_id,
+            [
+                TransactionCreate(
+                    type="expense", amount=1, currency="USD", tx_date=now
+                ),
+                TransactionCreate(type="income", amount=2, currency="USD", tx_date=now),
+            ],
+        ),
+        "delete_transaction": lambda db: crud.delete_transaction(db, 0, user_id),
+    }
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def user_id():
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except (OSError, SQLAlchemyError) as exc:
+        pytest.skip(f"database not available: {exc}")
+    async with async_session() as db:
+        user_id = await seed_user(db, EMAIL, SEED_ROWS)
+        await db.execute(
+            text("UPDATE users SET telegram_chat_id = :c WHERE id = :u"),
+            {"c": CHAT_ID, "u": user_id},
+        )
+        await db.commit()
+        await db.execute(text("ANALYZE"))
+    yield user_id
+    await engine.dispose()
+
+
+@pytest.mark.parametrize("name", list(probes(0)))
+async def test_index_access_only(user_id, name):
+    async with async_session() as db:
+        with capture_statements() as statements:
+            await probes(user_id)[name](db)
+    assert statements, f"{name} sent no statements"
+
+    scans = []
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            scans.extend(seq_scans(plan[0]["Plan"]))
+    assert not scans, f"{name}: sequential scan on {', '.join(sorted(set(scans)))}"